@@ -1,8 +1,11 @@
+from version import __version__
 from grammar import *
-from lexer import Token, Lexer
+from lexer import Token, TokenColumns, TokenStream, NeedInput, Lexer
 from parser import (ParseResultType, ParseItem, ParseErrorType,
                     ParseErrorInfo, Reduction, ProductionHandler, Parser)
 from tree import TreeNode, TreeBuilder, SimplifiedTreeBuilder
 from utility import (ParseError, parse_file, parse_string,
                      parse_file_to_tree, parse_string_to_tree,
-                     parse_file_to_stree, parse_string_to_stree)
+                     parse_file_to_stree, parse_string_to_stree,
+                     parse_many)
+from incremental import IncrementalParser
@@ -1,5 +1,14 @@
 ﻿import os
 import sys
+import re
+import array
+import struct
+from version import __version__
+import bisect
+
+
+# version of tables saved in a cache directory of Grammar.load_file
+_CACHE_FORMAT = 2
 
 
 # get a name of enumeration from a value of it
@@ -201,6 +210,13 @@ class LALRState(object):
         self.index = index
         self.actions = actions
 
+    def __getattr__(self, name):
+        # actions released by Grammar.compress_lalr_table are made
+        # from a table of a grammar on demand.
+        if name == "actions" and "grammar" in self.__dict__:
+            return self.grammar._lalr_actions(self)
+        raise AttributeError(name)
+
     def __repr__(self):
         return u"LALRState({0})".format(u", ".join((
             repr(self.index),
@@ -241,6 +257,121 @@ class LALRActionType:
     ACCEPT = 4
 
 
+class _CharClassMap(dict):
+    """Translation table from a character code to a character class.
+       It is filled lazily as characters appear.
+    """
+
+    def __init__(self, starts, ids):
+        self.starts = starts
+        self.ids = ids
+
+    def __missing__(self, c_ord):
+        cls = self.ids[bisect.bisect_right(self.starts, c_ord) - 1]
+        self[c_ord] = cls
+        return cls
+
+
+class _UnitChains(dict):
+    """Map of chains of reductions by unit productions like <A> ::= <B>.
+       After a goto on a nonterminal with a lookahead, reductions by
+       unit productions only change a goto of the same stack item.
+       So it maps (state * width + nonterminal) * width + lookahead to
+       (final state, last unit production) of a chain or None.
+       It is filled lazily as gotos appear in parsing.
+    """
+
+    def __init__(self, grammar):
+        self.grammar = grammar
+
+    def __missing__(self, key):
+        grm = self.grammar
+        table = grm.lalr_table
+        width = grm.lalr_width
+        goto_index, t = divmod(key, width)
+        state_index = goto_index // width
+
+        def unit_reduce(state_index):
+            a = table[state_index * width + t]
+            if a < -1:
+                p = grm.productions[-a - 2]
+                if (len(p.handles) == 1 and
+                    p.handles[0].type == SymbolType.NON_TERMINAL):
+                    return p
+            return None
+
+        chain = None
+        p = unit_reduce(table[goto_index] - 1)
+        if p is not None:
+            visited = set()
+            while p is not None and p.index not in visited:
+                visited.add(p.index)
+                last = p
+                q = table[state_index * width + p.head.index] - 1
+                p = unit_reduce(q)
+            if p is None and q >= 0:
+                chain = (q, last)
+        self[key] = chain
+        return chain
+
+
+class _CombTable(object):
+    """LALR table compressed by row displacement.
+       Non-error entries of all rows are packed into one vector where
+       each row starts at its own base, and a check vector tells a row
+       which an entry belongs to. It's indexed like a flat table.
+    """
+
+    def __init__(self, table, width):
+        self.width = width
+        self.size = len(table)
+        rows = []
+        for base in xrange(0, len(table), width):
+            rows.append([(i, table[base + i]) for i in xrange(width)
+                         if table[base + i]])
+
+        # place rows from the densest at the first base fitting in.
+        # a pattern of free slots in a row shape finds the base.
+        # free slots of a row width are kept at the end so that
+        # a row always fits in before them.
+        self.base = array.array("i", [0]) * len(rows)
+        used = bytearray(width)
+        check = [-1] * width
+        value = [0] * width
+        for r in sorted(xrange(len(rows)), key=lambda r: -len(rows[r])):
+            entries = rows[r]
+            if not entries:
+                continue
+            first = entries[0][0]
+            shape = re.compile("\0" + "".join(
+                ".{{{0}}}\0".format(entries[k][0] - entries[k - 1][0] - 1)
+                for k in xrange(1, len(entries))), re.S)
+            base = shape.search(used, first).start() - first
+            if base + width * 2 > len(used):
+                grow = base + width * 2 - len(used)
+                used.extend("\0" * grow)
+                check.extend([-1] * grow)
+                value.extend([0] * grow)
+            for i, a in entries:
+                used[base + i] = 1
+                check[base + i] = r
+                value[base + i] = a
+            self.base[r] = base
+        size = max(self.base) + width if rows else width
+        self.check = array.array("i", check[:size])
+        self.value = array.array("i", value[:size])
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.size:
+            raise IndexError("table index out of range")
+        row, symbol = divmod(i, self.width)
+        i = self.base[row] + symbol
+        return self.value[i] if self.check[i] == row else 0
+
+
 class Grammar(object):
     """Grammar.
        It holds a specific grammar table created by GOLD Parser and
@@ -263,70 +394,129 @@ class Grammar(object):
         self.production_id_lookup = {}
 
     @staticmethod
-    def load_file(file_or_path):
+    def load_file(file_or_path, cache_dir=None, minimize_dfa=False,
+                  compress_lalr=False):
         """Load grammar information from file.
            http://goldparser.org/doc/egt/index.htm
+           With cache_dir, tables of a processed grammar are saved in
+           the directory keyed by a hash of the file, a library version
+           and a cache format, and loading the same file again just
+           reads them back.
+           With minimize_dfa, the DFA is minimized by minimize_dfa, and
+           with compress_lalr, the LALR table is compressed by
+           compress_lalr_table.
         """
         if (isinstance(file_or_path, str) or
             isinstance(file_or_path, unicode)):
             with open(file_or_path, "rb") as file:
-                return Grammar._load(file)
+                return Grammar.load_file(file, cache_dir, minimize_dfa,
+                                         compress_lalr)
+        elif cache_dir is not None:
+            return Grammar._load_cached(file_or_path.read(), cache_dir,
+                                        minimize_dfa, compress_lalr)
         else:
-            return Grammar._load(file_or_path)
+            return Grammar._load(file_or_path, minimize_dfa, compress_lalr)
 
     @staticmethod
-    def _load(f):
-        # deserialize helper functions
-        def read_empty():
-            return None
+    def _load_cached(data, cache_dir, minimize_dfa=False,
+                     compress_lalr=False):
+        # tables are saved by marshal which only makes plain values,
+        # so a cache doesn't run code even in a shared directory.
+        # compression of the lalr table is done again after loading.
+        import marshal
+        import cStringIO
+        import hashlib
+        import tempfile
+        key = hashlib.sha1(data)
+        key.update("{0} {1} {2}".format(__version__, _CACHE_FORMAT,
+                                        marshal.version))
+        if minimize_dfa:
+            key.update("minimize_dfa")
+        path = os.path.join(cache_dir, key.hexdigest() + ".grammar")
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    grm = Grammar.load_tables(marshal.loads(f.read()))
+                if compress_lalr:
+                    grm.compress_lalr_table()
+                return grm
+            except Exception:
+                pass                            # a broken cache is rebuilt
+
+        grm = Grammar._load(cStringIO.StringIO(data), minimize_dfa)
+        tables = marshal.dumps(dict(grm._export_tables()), 2)
+        if compress_lalr:
+            grm.compress_lalr_table()
+
+        # write to a temporary file and rename it not to expose
+        # a partially written cache to other processes.
+        temp_path = None
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            fd, temp_path = tempfile.mkstemp(dir=cache_dir)
+            with os.fdopen(fd, "wb") as f:
+                f.write(tables)
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(temp_path, path)
+        except (IOError, OSError, RuntimeError):
+            # it works without a cache
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+        return grm
 
-        def read_byte():
-            c = f.read(1)
-            return c[0] if len(c) == 1 else None
-
-        def read_bool():
-            c = f.read(1)
-            return ord(c[0]) == 1 if len(c) == 1 else None
-
-        def read_short():
-            c = f.read(2)
-            return ord(c[0]) + ord(c[1]) * 256 if len(c) == 2 else None
-
-        def read_string():
-            s = ""
-            while True:
-                c = f.read(2)
-                if len(c) < 2 or (ord(c[0]) == 0 and ord(c[1]) == 0):
-                    break
-                s += c
-            return s.decode("utf-16le")
-
-        def read_value():
-            t = f.read(1)
-            if   t == 'E':
-                return read_empty()
-            elif t == 'b':
-                return read_byte()
-            elif t == 'B':
-                return read_bool()
-            elif t == 'I':
-                return read_short()
-            elif t == 'S':
-                return read_string()
-            else:
-                return None
+    @staticmethod
+    def _load(f, minimize_dfa=False, compress_lalr=False):
+        # a whole file is read at once and decoded over the buffer
+        data = f.read()
+        size = len(data)
+        unpack_short = struct.Struct("<H").unpack_from
+
+        def read_string(pos):
+            # return a string at pos and a position after its terminator
+            end = data.find("\0\0", pos)
+            while end != -1 and (end - pos) % 2:
+                end = data.find("\0\0", end + 1)
+            if end == -1:
+                end = size - (size - pos) % 2
+            return data[pos:end].decode("utf-16le"), end + 2
 
         # start
         grm = Grammar()
-        header = read_string()
+        header, pos = read_string(0)
         if header != u"GOLD Parser Tables/v5.0":
             raise Exception("Unknown Header: " + header)
 
         # read records
-        while read_byte() == 'M':
+        while pos < size and data[pos] == 'M':
+            if pos + 3 > size:
+                raise Exception("Unexpected End of File")
+            count = unpack_short(data, pos + 1)[0]
+            pos += 3
             v = []
-            for x in range(read_short()):
-                v.append(read_value())
+            for x in xrange(count):
+                if pos >= size:
+                    raise Exception("Unexpected End of File")
+                t = data[pos]
+                pos += 1
+                if   t == 'I':
+                    if pos + 2 > size:
+                        raise Exception("Unexpected End of File")
+                    v.append(unpack_short(data, pos)[0])
+                    pos += 2
+                elif t == 'S':
+                    s, pos = read_string(pos)
+                    v.append(s)
+                elif t == 'b':
+                    v.append(data[pos:pos + 1] or None)
+                    pos += 1
+                elif t == 'B':
+                    v.append(data[pos:pos + 1] == '\x01'
+                             if pos < size else None)
+                    pos += 1
+                else:  # empty or unknown
+                    v.append(None)
             t = v[0] if len(v) > 0 else None
             if   t == 'p':  # Property
                 grm.properties[v[1]] = Property(v[1], v[2], v[3])
@@ -373,11 +563,120 @@ class Grammar(object):
             raise Exception("Table Count Mismatch!")
 
         grm._process_after_load()
+        if minimize_dfa:
+            grm.minimize_dfa()
+        if compress_lalr:
+            grm.compress_lalr_table()
+        return grm
+
+    @staticmethod
+    def load_tables(tables):
+        """Construct grammar from tables written by export_to_py.
+           Tables hold a processed grammar so that it's just linked here.
+        """
+        grm = Grammar()
+        grm.properties = dict(
+            (i, Property(i, name, value))
+            for i, (name, value) in enumerate(tables["properties"]))
+        grm.charsets = dict(
+            (i, CharacterSet(i, uniplane, ranges))
+            for i, (uniplane, ranges) in enumerate(tables["charsets"]))
+
+        symbols = []
+        for i, (name, type, single_lexeme) in enumerate(tables["symbols"]):
+            symbol = Symbol(i, name, type)
+            symbol.single_lexeme = single_lexeme
+            symbols.append(symbol)
+
+        groups = []
+        for i, (name, container, start, end, advance_mode, ending_mode,
+                nesting_groups, scan_pattern) in enumerate(tables["groups"]):
+            group = SymbolGroup(i, name, symbols[container], symbols[start],
+                                symbols[end], advance_mode, ending_mode,
+                                nesting_groups)
+            group.scan_pattern = re.compile(scan_pattern)
+            groups.append(group)
+        for group in groups:
+            group.nesting_groups = tuple(groups[i]
+                                         for i in group.nesting_groups)
+
+        productions = []
+        for i, (head, handles, forward_child, merge_child, listify_recursion,
+                remove_single_lexeme) in enumerate(tables["productions"]):
+            p = Production(i, symbols[head], tuple(symbols[h]
+                                                   for h in handles))
+            p.sr_forward_child = forward_child
+            p.sr_merge_child = merge_child
+            p.sr_listify_recursion = listify_recursion
+            p.sr_remove_single_lexeme = remove_single_lexeme
+            productions.append(p)
+
+        # dfa states with edges and lookups of them
+        dfastates = [DFAState(i, symbols[accept_symbol]
+                              if accept_symbol is not None else None, None)
+                     for i, (accept_symbol, edges, class_lookup,
+                             edges_lookup) in enumerate(tables["dfastates"])]
+        for s, (accept_symbol, edges, class_lookup, edges_lookup) in zip(
+                dfastates, tables["dfastates"]):
+            s.edges = tuple(DFAEdge(grm.charsets[edges[i]],
+                                    dfastates[edges[i + 1]])
+                            for i in xrange(0, len(edges), 2))
+            s.class_lookup = tuple(
+                (t, s if t < 0 else dfastates[t]) if t != -1 else None
+                for t in class_lookup)
+            s.edges_lookup = tuple(
+                ((edges_lookup[i], edges_lookup[i + 1]), edges_lookup[i + 2],
+                 dfastates[edges_lookup[i + 3]])
+                for i in xrange(0, len(edges_lookup), 4))
+
+        # lalr states with actions
+        lalrstates = [LALRState(i, None)
+                      for i in xrange(len(tables["lalrstates"]))]
+        for s, actions in zip(lalrstates, tables["lalrstates"]):
+            s.actions = {}
+            for i in xrange(0, len(actions), 3):
+                symbol, type, target = actions[i:i + 3]
+                if type in (LALRActionType.SHIFT, LALRActionType.GOTO):
+                    target = lalrstates[target]
+                elif type == LALRActionType.REDUCE:
+                    target = productions[target]
+                s.actions[symbol] = LALRAction(symbols[symbol], type, target)
+
+        grm.symbols = dict(enumerate(symbols))
+        grm.symbolgroups = dict(enumerate(groups))
+        grm.productions = dict(enumerate(productions))
+        grm.dfastates = dict(enumerate(dfastates))
+        grm.dfainit = dfastates[tables["dfainit"]]
+        grm.lalrstates = dict(enumerate(lalrstates))
+        grm.lalrinit = lalrstates[tables["lalrinit"]]
+        grm._build_symbol_lookup()
+
+        grm.charclass_starts = tables["charclass_starts"]
+        grm.charclass_ids = tables["charclass_ids"]
+        grm.charclass_count = tables["charclass_count"]
+        grm.charclass_map = _CharClassMap(grm.charclass_starts,
+                                          grm.charclass_ids)
+        grm.charclass_bytes = tables["charclass_bytes"]
+        grm.group_by_start = dict((g.start.index, g) for g in groups)
+
+        grm.lalr_width = len(symbols)
+        grm.lalr_table = array.array("l", tables["lalr_table"])
+        grm.production_lengths = array.array(
+            "l", [len(p.handles) for p in productions])
+        grm.production_heads = array.array(
+            "l", [p.head.index for p in productions])
+        grm.lalr_default_reductions = array.array(
+            "l", tables["lalr_default_reductions"])
+        grm.lalr_sync_symbols = frozenset(tables["lalr_sync_symbols"])
+        grm.lalr_unit_chains = _UnitChains(grm)
         return grm
 
     def _process_after_load(self):
         self._link_reference()
+        self._build_char_classes()
         self._build_dfa_lookup()
+        self._build_group_lookup()
+        self._build_lalr_table()
         self._set_single_lexeme_symbol()
         self._set_simplication_rule()
 
@@ -413,6 +712,9 @@ class Grammar(object):
                 elif a.type == LALRActionType.GOTO:
                     a.target = self.lalrstates[a.target]
 
+        self._build_symbol_lookup()
+
+    def _build_symbol_lookup(self):
         self.symbol_EOF = [s for s in self.symbols.itervalues() if s.type == SymbolType.END_OF_FILE][0]
         self.symbol_Error = [s for s in self.symbols.itervalues() if s.type == SymbolType.ERROR][0]
 
@@ -422,6 +724,59 @@ class Grammar(object):
         for p in self.productions.itervalues():
             self.production_id_lookup[p.id] = p
 
+    def _build_char_classes(self):
+        # split characters into equivalence classes which are sets of
+        # characters belonging to the same charsets.
+        bounds = set([0])
+        for c in self.charsets.itervalues():
+            u = c.uniplane * 0x10000
+            for r in c.ranges:
+                bounds.add(u + r[0])
+                bounds.add(u + r[1] + 1)
+        starts = sorted(bounds)
+        members = [[] for x in starts]
+        for c in self.charsets.itervalues():
+            u = c.uniplane * 0x10000
+            for r in c.ranges:
+                i = bisect.bisect_left(starts, u + r[0])
+                j = bisect.bisect_left(starts, u + r[1] + 1)
+                for k in xrange(i, j):
+                    members[k].append(c.index)
+        class_lookup = {(): 0}
+        ids = []
+        for m in members:
+            key = tuple(sorted(m))
+            if key not in class_lookup:
+                class_lookup[key] = len(class_lookup)
+            ids.append(class_lookup[key])
+        self.charclass_starts = tuple(starts)
+        self.charclass_ids = tuple(ids)
+        self.charclass_count = len(class_lookup)
+        self.charclass_map = _CharClassMap(self.charclass_starts,
+                                           self.charclass_ids)
+        if self.charclass_count <= 256:
+            self.charclass_bytes = "".join(
+                chr(self.get_char_class(i)) for i in xrange(256))
+        else:
+            self.charclass_bytes = None
+
+    def get_char_class(self, c_ord):
+        """Return an equivalence class of a character code.
+        """
+        return self.charclass_ids[
+            bisect.bisect_right(self.charclass_starts, c_ord) - 1]
+
+    def classify_chars(self, s):
+        """Translate a string into a string of which each character
+           code is an equivalence class of a corresponding character.
+        """
+        if isinstance(s, unicode):
+            return s.translate(self.charclass_map)
+        elif self.charclass_bytes is not None:
+            return s.translate(self.charclass_bytes)
+        else:
+            return s.decode("latin-1").translate(self.charclass_map)
+
     def _build_dfa_lookup(self):
         # make a merged lookup-table for fast finding next state
         for s in self.dfastates.itervalues():
@@ -435,6 +790,239 @@ class Grammar(object):
                     ((u + r[0], u + r[1]), target_index, e.target) for r in e.charset.ranges)
             s.edges_lookup = tuple(sorted(edges_list, key=lambda x: x[0][0]))
 
+            # make a transition table indexed by a character class
+            class_lookup = [None] * self.charclass_count
+            for (r_min, r_max), target_index, target in s.edges_lookup:
+                i = bisect.bisect_right(self.charclass_starts, r_min) - 1
+                j = bisect.bisect_right(self.charclass_starts, r_max)
+                for k in xrange(i, j):
+                    cls = self.charclass_ids[k]
+                    if class_lookup[cls] is None:
+                        class_lookup[cls] = (target_index, target)
+            s.class_lookup = tuple(class_lookup)
+
+    def minimize_dfa(self):
+        """Merge equivalent DFA states by Hopcroft's algorithm and
+           coalesce adjacent ranges going to the same state in
+           edges_lookup. States are renumbered.
+           It returns counts of states and ranges before and after it
+           as {"states": (before, after), "edges": (before, after)}.
+        """
+        states = [self.dfastates[i] for i in xrange(len(self.dfastates))]
+        before = (len(states), sum(len(s.edges_lookup) for s in states))
+
+        # transitions by a character class with a dead state
+        # which missing transitions go to.
+        dead = len(states)
+        inverse = [{} for x in xrange(self.charclass_count)]
+        for s in states:
+            for cls, edge in enumerate(s.class_lookup):
+                target = edge[1].index if edge else dead
+                inverse[cls].setdefault(target, []).append(s.index)
+        for cls in xrange(self.charclass_count):
+            inverse[cls].setdefault(dead, []).append(dead)
+
+        # start from states partitioned by an accepted symbol
+        blocks = {None: set([dead])}
+        for s in states:
+            symbol = s.accept_symbol.index if s.accept_symbol else None
+            blocks.setdefault(symbol, set()).add(s.index)
+        partition = blocks.values()
+        block_of = {}
+        for i, block in enumerate(partition):
+            for s in block:
+                block_of[s] = i
+
+        # split blocks by predecessors of a block in waiting
+        waiting = range(len(partition))
+        in_waiting = set(waiting)
+        while waiting:
+            i = waiting.pop()
+            in_waiting.discard(i)
+            splitter = partition[i]
+            for cls in xrange(self.charclass_count):
+                sources = set()
+                for t in splitter:
+                    sources.update(inverse[cls].get(t, ()))
+                for j in set(block_of[s] for s in sources):
+                    block = partition[j]
+                    inside = block & sources
+                    if len(inside) == len(block):
+                        continue
+                    outside = block - inside
+                    k = len(partition)
+                    partition[j] = inside
+                    partition.append(outside)
+                    for s in outside:
+                        block_of[s] = k
+                    if j in in_waiting or len(outside) <= len(inside):
+                        waiting.append(k)
+                        in_waiting.add(k)
+                    else:
+                        waiting.append(j)
+                        in_waiting.add(j)
+
+        # keep the first state of each block except a dead block.
+        # states of a dead block never accept and they are dropped.
+        kept = [s for s in states
+                if block_of[s.index] != block_of[dead] and
+                   s.index == min(partition[block_of[s.index]])]
+        merged = dict((block_of[s.index], s) for s in kept)
+        for s in kept:
+            s.edges = tuple(
+                DFAEdge(e.charset, merged[block_of[e.target.index]])
+                for e in s.edges
+                if block_of[e.target.index] != block_of[dead])
+        self.dfainit = merged[block_of[self.dfainit.index]]
+        for i, s in enumerate(kept):
+            s.index = i
+        self.dfastates = dict(enumerate(kept))
+        self._build_dfa_lookup()
+        self._build_group_lookup()
+
+        for s in kept:
+            ranges = []
+            for (r_min, r_max), target_index, target in s.edges_lookup:
+                if (ranges and ranges[-1][2] is target and
+                    r_min <= ranges[-1][0][1] + 1):
+                    (m_min, m_max), target_index, target = ranges[-1]
+                    ranges[-1] = ((m_min, max(m_max, r_max)),
+                                  target_index, target)
+                else:
+                    ranges.append(((r_min, r_max), target_index, target))
+            s.edges_lookup = tuple(ranges)
+
+        after = (len(kept), sum(len(s.edges_lookup) for s in kept))
+        return {"states": (before[0], after[0]),
+                "edges": (before[1], after[1])}
+
+    def _build_group_lookup(self):
+        # map a start symbol to a group
+        self.group_by_start = {}
+        for g in self.symbolgroups.itervalues():
+            self.group_by_start[g.start.index] = g
+
+        # find symbols acceptable from each dfa state
+        reachable = dict((s.index, set([s.accept_symbol.index])
+                          if s.accept_symbol else set())
+                         for s in self.dfastates.itervalues())
+        changed = True
+        while changed:
+            changed = False
+            for s in self.dfastates.itervalues():
+                r = reachable[s.index]
+                n = len(r)
+                for e in s.edges:
+                    r.update(reachable[e.target.index])
+                changed = changed or len(r) != n
+
+        # make a pattern for each group finding character classes which
+        # may start an end symbol or a start symbol of nesting groups.
+        # the rest of characters are skipped at once in a group.
+        for g in self.symbolgroups.itervalues():
+            symbols = set([g.end.index])
+            symbols.update(n.start.index for n in g.nesting_groups)
+            classes = [cls for cls, edge
+                       in enumerate(self.dfainit.class_lookup)
+                       if edge and reachable[edge[1].index] & symbols]
+            if classes:
+                g.scan_pattern = re.compile(u"[{0}]".format(
+                    u"".join(re.escape(unichr(cls)) for cls in classes)))
+            else:
+                g.scan_pattern = re.compile(u"(?!)")
+
+    def _build_lalr_table(self):
+        # flatten lalr actions into an integer table indexed by
+        # state * lalr_width + symbol. terminals and nonterminals have
+        # different indices so gotos are stored in the same table.
+        #   0: error, > 0: shift or goto to (state - 1),
+        #  -1: accept, < -1: reduce by (-production - 2)
+        width = len(self.symbols)
+        table = array.array("l", [0]) * (len(self.lalrstates) * width)
+        for s in self.lalrstates.itervalues():
+            base = s.index * width
+            for a in s.actions.itervalues():
+                if a.symbol.type == SymbolType.NON_TERMINAL:
+                    if a.type == LALRActionType.GOTO:
+                        table[base + a.symbol.index] = a.target.index + 1
+                elif a.type == LALRActionType.SHIFT:
+                    table[base + a.symbol.index] = a.target.index + 1
+                elif a.type == LALRActionType.REDUCE:
+                    table[base + a.symbol.index] = -a.target.index - 2
+                elif a.type == LALRActionType.ACCEPT:
+                    table[base + a.symbol.index] = -1
+        self.lalr_width = width
+        self.lalr_table = table
+        productions = [self.productions[i]
+                       for i in xrange(len(self.productions))]
+        self.production_lengths = array.array(
+            "l", [len(p.handles) for p in productions])
+        self.production_heads = array.array(
+            "l", [p.head.index for p in productions])
+
+        # a state which only reduces by one production doesn't need
+        # a lookahead to decide an action. keep it as a default reduction.
+        defaults = array.array("l", [0]) * len(self.lalrstates)
+        for s in self.lalrstates.itervalues():
+            reduces = set(a.target.index for a in s.actions.itervalues()
+                          if a.type == LALRActionType.REDUCE)
+            if (len(reduces) == 1 and
+                all(a.type == LALRActionType.REDUCE
+                    for a in s.actions.itervalues())):
+                defaults[s.index] = -reduces.pop() - 2
+        self.lalr_default_reductions = defaults
+
+        # terminals closing a production like ")" or ";" are good points
+        # to resume parsing after an error.
+        self.lalr_sync_symbols = frozenset(
+            [p.handles[-1].index for p in productions
+             if len(p.handles) > 1 and
+                p.handles[-1].type == SymbolType.TERMINAL] +
+            [self.symbol_EOF.index])
+
+        # collapse chains of unit productions only for gotos appearing
+        # in parsing with trim_reduction
+        self.lalr_unit_chains = _UnitChains(self)
+
+    def compress_lalr_table(self):
+        """Replace the LALR table with one compressed by row displacement.
+           It's indexed in the same way with a lookup a bit slower.
+           Actions of states are released and made from the table when
+           they're accessed like in reporting an error.
+           It's for a large grammar of which most entries are errors.
+           It returns counts of entries as {"entries": (before, after)}.
+        """
+        before = len(self.lalr_table)
+        if not isinstance(self.lalr_table, _CombTable):
+            self.lalr_table = _CombTable(self.lalr_table, self.lalr_width)
+            for s in self.lalrstates.itervalues():
+                del s.actions
+                s.grammar = self
+        return {"entries": (before, len(self.lalr_table.value))}
+
+    def _lalr_actions(self, s):
+        # make actions of a state from the lalr table
+        actions = {}
+        base = s.index * self.lalr_width
+        for i in xrange(self.lalr_width):
+            a = self.lalr_table[base + i]
+            if a == 0:
+                continue
+            symbol = self.symbols[i]
+            if a == -1:
+                action = LALRAction(symbol, LALRActionType.ACCEPT, 0)
+            elif a < -1:
+                action = LALRAction(symbol, LALRActionType.REDUCE,
+                                    self.productions[-a - 2])
+            elif symbol.type == SymbolType.NON_TERMINAL:
+                action = LALRAction(symbol, LALRActionType.GOTO,
+                                    self.lalrstates[a - 1])
+            else:
+                action = LALRAction(symbol, LALRActionType.SHIFT,
+                                    self.lalrstates[a - 1])
+            actions[i] = action
+        return actions
+
     def _set_single_lexeme_symbol(self):
         # find terminals having only single lexeme.
         # (by finding dfa-state nodes has one-acyclic path from an initial state)
@@ -518,30 +1106,213 @@ class Grammar(object):
     def export_to_py(self, f):
         """Export information to a python file.
            With an exported py, grammar can be constructed without a egt file.
+           It's written as tables of constants including a result of
+           processing after load, so importing it and constructing grammar
+           from it don't need to process grammar again.
         """
-
-        def repr_dict(name, container):
-            f.write(u"\tgrm.{0} = {{\n".format(name))
-            for k, v in sorted(container.iteritems()):
-                f.write(u"\t\t{0}:{1},\n".format(repr(k), repr(v)))
-            f.write(u"\t}\n")
-
         f.write(u"from pyauparser import *\n")
 
         f.write(u"\n")
-        f.write(u"def load():\n")
-        f.write(u"\tgrm = Grammar()\n")
-
-        repr_dict("properties", self.properties)
-        repr_dict("charsets", self.charsets)
-        repr_dict("symbols", self.symbols)
-        repr_dict("symbolgroups", self.symbolgroups)
-        repr_dict("productions", self.productions)
+        f.write(u"TABLES = {\n")
+        for name, value in self._export_tables():
+            if value and isinstance(value, tuple):
+                f.write(u"\t{0}: (\n".format(repr(name)))
+                if isinstance(value[0], tuple):
+                    for v in value:
+                        f.write(u"\t\t{0},\n".format(repr(v)))
+                else:
+                    for i in xrange(0, len(value), 16):
+                        f.write(u"\t\t{0},\n".format(
+                            u", ".join(repr(v) for v in value[i:i + 16])))
+                f.write(u"\t),\n")
+            else:
+                f.write(u"\t{0}: {1},\n".format(repr(name), repr(value)))
+        f.write(u"}\n")
 
-        f.write(u"\tgrm.dfainit = {0}\n".format(self.dfainit.index))
-        repr_dict("dfastates", self.dfastates)
-        f.write(u"\tgrm.lalrinit = {0}\n".format(self.lalrinit.index))
-        repr_dict("lalrstates", self.lalrstates)
+        f.write(u"\n")
+        f.write(u"def load():\n")
+        f.write(u"\treturn Grammar.load_tables(TABLES)\n")
+
+    def _export_tables(self):
+        # flatten a processed grammar to tuples of ints and strings.
+        # objects are referred by index, and a missing edge in
+        # class_lookup of a dfa state is -1.
+        def values(container):
+            return [container[i] for i in xrange(len(container))]
+
+        def flat(items):
+            return tuple(x for item in items for x in item)
+
+        dfastates = []
+        for s in values(self.dfastates):
+            dfastates.append((
+                s.accept_symbol.index if s.accept_symbol else None,
+                flat((e.charset.index, e.target.index) for e in s.edges),
+                tuple(edge[0] if edge else -1 for edge in s.class_lookup),
+                flat((r_min, r_max, target_index, target.index)
+                     for (r_min, r_max), target_index, target
+                     in s.edges_lookup)))
+
+        lalrstates = []
+        for s in values(self.lalrstates):
+            lalrstates.append(flat(
+                (a.symbol.index, a.type,
+                 a.target.index if a.type != LALRActionType.ACCEPT else None)
+                for k, a in sorted(s.actions.iteritems())))
+
+        return [
+            ("properties", tuple((p.name, p.value)
+                                 for p in values(self.properties))),
+            ("charsets", tuple((c.uniplane, tuple(c.ranges))
+                               for c in values(self.charsets))),
+            ("symbols", tuple((s.name, s.type, s.single_lexeme)
+                              for s in values(self.symbols))),
+            ("groups", tuple((g.name, g.container.index, g.start.index,
+                              g.end.index, g.advance_mode, g.ending_mode,
+                              tuple(n.index for n in g.nesting_groups),
+                              g.scan_pattern.pattern)
+                             for g in values(self.symbolgroups))),
+            ("productions", tuple((p.head.index,
+                                   tuple(h.index for h in p.handles),
+                                   p.sr_forward_child, p.sr_merge_child,
+                                   p.sr_listify_recursion,
+                                   p.sr_remove_single_lexeme)
+                                  for p in values(self.productions))),
+            ("dfainit", self.dfainit.index),
+            ("dfastates", tuple(dfastates)),
+            ("lalrinit", self.lalrinit.index),
+            ("lalrstates", tuple(lalrstates)),
+            ("charclass_starts", self.charclass_starts),
+            ("charclass_ids", self.charclass_ids),
+            ("charclass_count", self.charclass_count),
+            ("charclass_bytes", self.charclass_bytes),
+            ("lalr_table", tuple(self.lalr_table)),
+            ("lalr_default_reductions",
+             tuple(self.lalr_default_reductions)),
+            ("lalr_sync_symbols", tuple(sorted(self.lalr_sync_symbols))),
+        ]
+
+    def export_lexer_to_py(self, f):
+        """Export a lexer specialized for this grammar to a python file.
+           DFA states and edges are written as integer comparisons and
+           an exported Lexer class uses them instead of DFA tables.
+        """
 
-        f.write(u"\tgrm._process_after_load()\n")
-        f.write(u"\treturn grm\n")
+        def merged_ranges(s):
+            # coalesce adjacent ranges heading for the same target
+            ranges = []
+            for (r_min, r_max), target_index, target in s.edges_lookup:
+                if (ranges and ranges[-1][1] + 1 == r_min and
+                    ranges[-1][2] is target):
+                    ranges[-1][1] = r_max
+                else:
+                    ranges.append([r_min, r_max, target])
+            return ranges
+
+        def range_cond(r_min, r_max):
+            if r_min == r_max:
+                return u"c == {0}".format(r_min)
+            else:
+                return u"{0} <= c <= {1}".format(r_min, r_max)
+
+        def write_edges(ranges, depth):
+            # binary search over sorted ranges
+            tab = u"\t" * depth
+            if len(ranges) <= 3:
+                for i, (r_min, r_max, target) in enumerate(ranges):
+                    f.write(u"{0}{1} {2}:\n".format(
+                        tab, u"if" if i == 0 else u"elif",
+                        range_cond(r_min, r_max)))
+                    write_goto(target, depth + 1)
+                return
+            mid = len(ranges) // 2
+            r_min, r_max, target = ranges[mid]
+            f.write(u"{0}if c < {1}:\n".format(tab, r_min))
+            write_edges(ranges[:mid], depth + 1)
+            f.write(u"{0}elif c <= {1}:\n".format(tab, r_max))
+            write_goto(target, depth + 1)
+            f.write(u"{0}else:\n".format(tab))
+            write_edges(ranges[mid + 1:], depth + 1)
+
+        def write_goto(target, depth):
+            tab = u"\t" * depth
+            f.write(u"{0}state = {1}\n".format(tab, target.index))
+            f.write(u"{0}i += 1\n".format(tab))
+            if target.accept_symbol:
+                f.write(u"{0}hit = {1}\n".format(
+                    tab, target.accept_symbol.index))
+                f.write(u"{0}hit_i = i\n".format(tab))
+            f.write(u"{0}continue\n".format(tab))
+
+        def write_state(s, depth):
+            tab = u"\t" * depth
+            ranges = merged_ranges(s)
+            loops = [r for r in ranges if r[2] is s]
+            ranges = [r for r in ranges if r[2] is not s]
+            if loops:
+                cond = u" or ".join(range_cond(r[0], r[1]) for r in loops)
+                f.write(u"{0}if {1}:\n".format(tab, cond))
+                f.write(u"{0}\ti += 1\n".format(tab))
+                f.write(u"{0}\twhile i < end:\n".format(tab))
+                f.write(u"{0}\t\tc = ord(buf[i])\n".format(tab))
+                f.write(u"{0}\t\tif not ({1}):\n".format(tab, cond))
+                f.write(u"{0}\t\t\tbreak\n".format(tab))
+                f.write(u"{0}\t\ti += 1\n".format(tab))
+                if s.accept_symbol:
+                    f.write(u"{0}\thit_i = i\n".format(tab))
+                f.write(u"{0}\tcontinue\n".format(tab))
+            if ranges:
+                write_edges(ranges, depth)
+            f.write(u"{0}break\n".format(tab))
+
+        def write_states(states, depth):
+            # binary search over sorted states
+            tab = u"\t" * depth
+            if len(states) == 1:
+                write_state(states[0], depth)
+                return
+            mid = len(states) // 2
+            f.write(u"{0}if state < {1}:\n".format(tab, states[mid].index))
+            write_states(states[:mid], depth + 1)
+            f.write(u"{0}else:\n".format(tab))
+            write_states(states[mid:], depth + 1)
+
+        f.write(u"import pyauparser\n")
+        f.write(u"\n")
+        f.write(u"\n")
+        f.write(u"def match(buf, pos, end):\n")
+        f.write(u"\t\"\"\"Run DFA on buf[pos:end] and return a tuple of\n")
+        f.write(u"\t   (accepted symbol index or -1, end of accepted lexeme,\n")
+        f.write(u"\t    position where DFA stopped or end).\n")
+        f.write(u"\t\"\"\"\n")
+        f.write(u"\ti = pos\n")
+        f.write(u"\thit = -1\n")
+        f.write(u"\thit_i = pos\n")
+        f.write(u"\tstate = {0}\n".format(self.dfainit.index))
+        f.write(u"\twhile i < end:\n")
+        f.write(u"\t\tc = ord(buf[i])\n")
+        write_states([s for k, s in sorted(self.dfastates.iteritems())], 2)
+        f.write(u"\treturn hit, hit_i, i\n")
+        f.write(u"\n")
+        f.write(u"\n")
+        f.write(u"class Lexer(pyauparser.Lexer):\n")
+        f.write(u"\t\"\"\"Lexer running on a generated match function.\n")
+        f.write(u"\t   It should be created with the grammar exported it.\n")
+        f.write(u"\t\"\"\"\n")
+        f.write(u"\n")
+        f.write(u"\tdef _match(self):\n")
+        f.write(u"\t\twhile True:\n")
+        f.write(u"\t\t\tpos = self.buf_cur\n")
+        f.write(u"\t\t\tend = pos + self.buf_remain\n")
+        f.write(u"\t\t\thit, hit_i, i = match(self.buf, pos, end)\n")
+        f.write(u"\t\t\tif i < end:\n")
+        f.write(u"\t\t\t\ti += 1\n")
+        f.write(u"\t\t\t\tbreak\n")
+        f.write(u"\t\t\tif (self.max_token_length is not None and\n")
+        f.write(u"\t\t\t\t\tend - pos >= self.max_token_length):\n")
+        f.write(u"\t\t\t\treturn None, 0, end - pos\n")
+        f.write(u"\t\t\tself._load_buffer()\n")
+        f.write(u"\t\t\tif self.buf_remain == end - pos:\n")
+        f.write(u"\t\t\t\tbreak\n")
+        f.write(u"\t\tsymbol = self.grammar.symbols[hit] if hit >= 0 else None\n")
+        f.write(u"\t\treturn symbol, hit_i - pos, i - pos\n")
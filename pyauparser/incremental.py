@@ -0,0 +1,183 @@
+import lexer
+import parser
+import tree
+from grammar import SymbolType
+from utility import ParseError
+
+
+class IncrementalParser(object):
+    """Parser which keeps a parse-tree of the last input and reparses
+       an edited input reusing subtrees of it.
+       A subtree is reused when it starts in a same LALR state and its
+       tokens and a lookahead token after it are out of an edit.
+       Nodes of a tree have extra properties for it.
+         first: first token
+         size: number of tokens
+         start_state: index of a LALR state where it starts
+    """
+
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.lexer = lexer.Lexer(grammar)
+        self.tokens = []
+        self.terminals = []
+        self.tree = None
+        self.reused_count = 0
+        self._starts = {}
+
+    def parse(self, s):
+        """ Parse s and return a parse-tree.
+        """
+        self.lexer.load_string(s)
+        return self._parse(self.lexer.read_token_all(), False)
+
+    def reparse(self, s, edit):
+        """ Parse s edited from the last input and return a parse-tree
+            same as one by parse. Edit is a tuple of
+            (offset, removed length, inserted text).
+        """
+        if self.tree is None:
+            return self.parse(s)
+        tokens = self.lexer.relex(s, self.tokens, edit)
+        return self._parse(tokens, True)
+
+    def _parse(self, tokens, reuse):
+        terminals = [t for t in tokens if t.symbol.type != SymbolType.NOISE]
+
+        # find unchanged runs of tokens at head and tail
+        head = tail = 0
+        if reuse:
+            old = self.terminals
+            n = min(len(old), len(terminals))
+            while head < n and terminals[head] is old[head]:
+                head += 1
+            while (tail < n - head and
+                   terminals[-tail - 1] is old[-tail - 1]):
+                tail += 1
+        tail = len(terminals) - tail
+
+        def run(i):
+            if i < head:
+                return 0
+            elif i >= tail:
+                return 1
+            else:
+                return None
+
+        old_tree = self.tree
+        self.tokens = tokens
+        self.terminals = terminals
+        self.tree = None
+        self.reused_count = 0
+        created = []
+        reused_nodes = set()
+        grm = self.grammar
+        table = grm.lalr_table
+        width = grm.lalr_width
+        lengths = grm.production_lengths
+        heads = grm.production_heads
+        starts = self._starts
+        states = [grm.lalrinit.index]
+        nodes = [None]
+        i = 0
+        while True:
+            token = terminals[i]
+            state = states[-1]
+
+            # shift a subtree of the last tree if possible
+            r = run(i)
+            if r is not None:
+                reused = None
+                for node in starts.get(id(token), ()):
+                    if (node.start_state == state and
+                        run(i + node.size) == r):
+                        goto = table[state * width +
+                                     node.production.head.index]
+                        if goto > 0:
+                            reused = node
+                            break
+                if reused:
+                    states.append(goto - 1)
+                    nodes.append(reused)
+                    i += reused.size
+                    reused_nodes.add(id(reused))
+                    continue
+
+            action = table[state * width + token.symbol.index]
+            if action > 0:
+                # Shift
+                node = tree.TreeNode(token=token)
+                node.first = token
+                node.size = 1
+                states.append(action - 1)
+                nodes.append(node)
+                i += 1
+
+            elif action < -1:
+                # Reduce
+                p = -action - 2
+                n = lengths[p]
+                childs = nodes[len(nodes) - n:]
+                del nodes[len(nodes) - n:]
+                del states[len(states) - n:]
+                node = tree.TreeNode(production=grm.productions[p],
+                                     childs=childs)
+                node.first = None
+                node.size = 0
+                for c in childs:
+                    if node.first is None:
+                        node.first = c.first
+                    node.size += c.size
+                node.start_state = states[-1]
+                goto = table[states[-1] * width + heads[p]]
+                states.append(goto - 1)
+                nodes.append(node)
+                if node.size:
+                    created.append(node)
+
+            elif action == -1:
+                # Accept
+                self.tree = nodes[-1]
+                self.reused_count = len(reused_nodes)
+                if reuse:
+                    self._unindex(old_tree, reused_nodes)
+                else:
+                    self._starts = {}
+                for node in created:
+                    self._starts.setdefault(id(node.first), []).insert(0, node)
+                return self.tree
+
+            else:
+                self._starts = {}
+                raise ParseError(self._error_info(states[-1], token))
+
+    def _error_info(self, state, token):
+        state = self.grammar.lalrstates[state]
+        offset = token.offset + len(token.lexeme)
+        if token.symbol.type == SymbolType.ERROR:
+            return parser.ParseErrorInfo(parser.ParseErrorType.LEXICAL_ERROR,
+                                         offset, state, token, None,
+                                         token.lines)
+        expected_symbols = [a.symbol for a in state.actions.itervalues()
+                            if a.symbol.type in (SymbolType.TERMINAL,
+                                                 SymbolType.END_OF_FILE,
+                                                 SymbolType.GROUP_START,
+                                                 SymbolType.GROUP_END)]
+        return parser.ParseErrorInfo(parser.ParseErrorType.SYNTAX_ERROR,
+                                     offset, state, token, expected_symbols,
+                                     token.lines)
+
+    def _unindex(self, root, reused_nodes):
+        # remove nodes of the last tree except reused subtrees
+        # from a map of a first token to nodes starting with it.
+        nodes = [root]
+        while nodes:
+            node = nodes.pop()
+            if node.production is None or id(node) in reused_nodes:
+                continue
+            if node.size:
+                starting = self._starts[id(node.first)]
+                starting.remove(node)
+                if not starting:
+                    del self._starts[id(node.first)]
+            nodes.extend(node.childs)
@@ -1,5 +1,7 @@
 import os
 import sys
+import array
+import bisect
 import grammar
 
 
@@ -7,17 +9,303 @@ class Token(object):
     """Token which is a result from Lexer
        symbol: symbol in grammar
        lexeme: text hit
+       offset: character offset of lexeme in input
+       reach: offset after the furthest character examined by scans
+              of Lexer to read this token and tokens before it
     """
 
-    def __init__(self, symbol, lexeme, position):
+    reach = None
+
+    def __init__(self, symbol, lexeme, offset, lines=None):
         self.symbol = symbol
         self.lexeme = lexeme
-        self.position = position
+        self.offset = offset
+        self.lines = lines
+
+    @property
+    def position(self):
+        if self.lines is None:
+            return None
+        return self.lines.position(self.offset)
 
     def __str__(self):
         return "{0} {1}".format(self.symbol.id, repr(self.lexeme))
 
 
+class LineIndex(object):
+    """Index of offsets where lines start.
+       It's built while input is read, or lazily over a whole text,
+       and resolves an offset to (line, column) on demand.
+    """
+
+    def __init__(self, text=None):
+        self.text = text
+        self.starts = array.array("l", [0])
+        self.first_line = 1
+        self.end = 0
+
+    def add(self, text, offset):
+        # index new lines in text which starts at offset
+        if offset + len(text) > self.end:
+            self._scan(text, max(self.end - offset, 0), len(text), offset)
+
+    def _scan(self, text, i, end, base):
+        while True:
+            i = text.find("\n", i, end)
+            if i == -1:
+                break
+            i += 1
+            self.starts.append(base + i)
+        self.end = base + end
+
+    def prune(self, offset):
+        # forget lines before the line including offset
+        i = bisect.bisect_right(self.starts, offset) - 1
+        if i > 0:
+            del self.starts[:i]
+            self.first_line += i
+
+    def part(self, start, end):
+        # copy lines which offsets from start to end are in
+        self.position(end)
+        i = max(bisect.bisect_right(self.starts, start) - 1, 0)
+        j = bisect.bisect_right(self.starts, end)
+        lines = LineIndex()
+        lines.starts = self.starts[i:j]
+        lines.first_line = self.first_line + i
+        lines.end = end
+        return lines
+
+    def copy(self):
+        lines = LineIndex(self.text)
+        lines.starts = array.array("l", self.starts)
+        lines.first_line = self.first_line
+        lines.end = self.end
+        return lines
+
+    def position(self, offset):
+        if self.text is not None and offset > self.end:
+            self._scan(self.text, self.end, min(offset, len(self.text)), 0)
+        i = bisect.bisect_right(self.starts, offset)
+        if i == 0:
+            return None
+        return (self.first_line + i - 1, offset - self.starts[i - 1] + 1)
+
+
+class TokenColumns(object):
+    """Tokens stored in parallel compact arrays instead of Token objects.
+       symbols: symbol indices in grammar
+       offsets: start offsets of lexemes in source
+       lengths: lengths of lexemes
+       Lexemes and tokens are materialized only on demand.
+    """
+
+    def __init__(self, grammar, source, lines=None, source_offset=0):
+        self.grammar = grammar
+        self.source = source
+        self.lines = lines
+        self.source_offset = source_offset
+        self.symbols = array.array("H")
+        self.offsets = array.array("l")
+        self.lengths = array.array("l")
+
+    def append(self, symbol_index, offset, length):
+        self.symbols.append(symbol_index)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __getitem__(self, i):
+        return self.token(i)
+
+    def __iter__(self):
+        for i in xrange(len(self.symbols)):
+            yield self.token(i)
+
+    def symbol(self, i):
+        return self.grammar.symbols[self.symbols[i]]
+
+    def lexeme(self, i):
+        offset = self.offsets[i]
+        return self.source[offset:offset + self.lengths[i]]
+
+    def position(self, i):
+        if self.lines is None:
+            return None
+        return self.lines.position(self.source_offset + self.offsets[i])
+
+    def token(self, i):
+        return Token(self.symbol(i), self.lexeme(i),
+                     self.source_offset + self.offsets[i], self.lines)
+
+
+class TokenStream(object):
+    """Reader of tokens from an iterable like a generator.
+       It can be loaded to Parser in place of Lexer and
+       it gives an EOF token when the iterable is exhausted.
+    """
+
+    def __init__(self, grammar, tokens):
+        self.grammar = grammar
+        self.tokens = iter(tokens)
+        self.token = None
+        self.lines = None
+
+    def read_token(self):
+        token = next(self.tokens, None)
+        if token is None:
+            token = Token(self.grammar.symbol_EOF, "", self.offset,
+                          self.lines)
+        self.token = token
+        self.lines = token.lines
+        return token
+
+    @property
+    def offset(self):
+        if self.token is None:
+            return 0
+        return self.token.offset + len(self.token.lexeme)
+
+    @property
+    def position(self):
+        if self.lines is None:
+            return None
+        return self.lines.position(self.offset)
+
+    @property
+    def line(self):
+        position = self.position
+        return position[0] if position else None
+
+    @property
+    def column(self):
+        position = self.position
+        return position[1] if position else None
+
+
+class NeedInput(Exception):
+    """Raised by Lexer loaded by load_feed when it needs more input
+       to decide a next token.
+    """
+    pass
+
+
+class _FeedReader(object):
+    # file-like reader over chunks pushed by Lexer.feed
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def read(self, size=-1):
+        if size < 0 and not self.closed:
+            raise NeedInput()
+        if self.chunks:
+            data = "".join(self.chunks)
+            self.chunks = []
+            return data
+        if self.closed:
+            return ""
+        raise NeedInput()
+
+    def copy(self):
+        reader = _FeedReader()
+        reader.chunks = list(self.chunks)
+        reader.closed = self.closed
+        return reader
+
+
+class _ChunkReader(object):
+    # file-like reader over an iterable of chunks
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+
+    def read(self, size=-1):
+        if size < 0:
+            return "".join(self.chunks)
+        for chunk in self.chunks:
+            if chunk:
+                return chunk
+        return ""
+
+
+class _PartialReader(object):
+    # file-like reader returning data as soon as some of it arrives
+    # from a file descriptor or an object having read1.
+    # read of a file waits for whole size bytes from a pipe.
+
+    def __init__(self, source):
+        self.source = source
+        if isinstance(source, (int, long)):
+            self.read_some = self._read_fd
+        else:
+            self.read_some = source.read1
+
+    def _read_fd(self, size):
+        return os.read(self.source, size)
+
+    def read(self, size=-1):
+        if size >= 0:
+            return self.read_some(size)
+        chunks = []
+        while True:
+            data = self.read_some(65536)
+            if not data:
+                return data.join(chunks)
+            chunks.append(data)
+
+
+class _DecodingReader(object):
+    # file-like reader decoding data of a reader as soon as it arrives
+
+    def __init__(self, source, encoding):
+        import codecs
+        self.source = source
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+
+    def read(self, size=-1):
+        while True:
+            data = self.source.read(size)
+            text = self.decoder.decode(data, not data)
+            if text or not data:
+                return text
+
+
+_parallel_source = None
+
+
+def _init_parallel(lexer_class, grammar_, source):
+    # keep a source in a worker process of tokenize_parallel
+    global _parallel_source
+    _parallel_source = (lexer_class, grammar_, source)
+
+
+def _tokenize_range(task):
+    # lex tokens starting in [start, end) of a source and return them with
+    # a start offset of a next token, or None if stopped by EOF or error
+    start, end = task
+    lexer_class, grammar_, source = _parallel_source
+    lexer = lexer_class(grammar_)
+    lexer.load_string(source)
+    lexer._seek(start)
+    symbols = array.array("H")
+    offsets = array.array("l")
+    lengths = array.array("l")
+    while True:
+        if lexer.offset >= end:
+            return symbols, offsets, lengths, lexer.offset
+        token = lexer.read_token()
+        symbols.append(token.symbol.index)
+        offsets.append(token.offset)
+        lengths.append(len(token.lexeme))
+        if token.symbol.type in (grammar.SymbolType.END_OF_FILE,
+                                 grammar.SymbolType.ERROR):
+            return symbols, offsets, lengths, None
+
+
 class Lexer(object):
     """Lexical Analyzer class which generate tokens from string.
        It works by a DFA in grammar.
@@ -27,98 +315,316 @@ class Lexer(object):
         self.grammar = grammar
         self._load(None, False)
 
-    def load_file(self, file_or_path, encoding=None):
+    def load_file(self, file_or_path, encoding=None, use_mmap=False):
         """ Load a file to lexer.
             File_or_path could be file object or file name.
+            With use_mmap, a whole file is memory-mapped and lexed directly
+            without reading it into buffer. It's only for bytes of
+            a whole file, so it raises ValueError with encoding or
+            a file object not at its start.
         """
+        if use_mmap and encoding:
+            raise ValueError("use_mmap can't decode a file by encoding")
         if (isinstance(file_or_path, str) or
             isinstance(file_or_path, unicode)):
             import codecs
             if encoding:
                 self._load(codecs.open(file_or_path, encoding=encoding), True)
             else:
-                self._load(open(file_or_path, "rb"), False)
+                if use_mmap:
+                    with open(file_or_path, "rb") as f:
+                        self._load_mmap(f)
+                else:
+                    self._load(open(file_or_path, "rb"), False)
         else:
-            self._load(file_or_path, encoding is not None)
+            if use_mmap:
+                self._load_mmap(file_or_path)
+            else:
+                self._load(file_or_path, encoding is not None)
 
     def load_string(self, s):
         """ Load a string to lexer.
+            S could be str, unicode or mmap, and it's lexed directly.
+        """
+        self._load(None, isinstance(s, unicode), s)
+
+    def load_stream(self, source, encoding=None, max_token_length=None):
+        """ Load a stream to lexer which is read while lexing.
+            Source could be an object having read(size) like a pipe,
+            a file descriptor, or an iterable of chunks like a generator
+            of socket data.
+            Consumed input is dropped so memory is bounded by the longest
+            pending token or group, and with max_token_length a token or
+            a group getting longer than it is given as an error token.
+            Positions are kept only for the recent part of input.
+            A file descriptor or an object having read1 is read as soon
+            as some input arrives. A file object is read through its own
+            buffer, which waits for a whole buffer from a pipe, so pass
+            a file descriptor like sys.stdin.fileno() for a slow pipe.
+        """
+        if isinstance(source, (int, long)) or hasattr(source, "read1"):
+            source = _PartialReader(source)
+        elif not hasattr(source, "read"):
+            source = _ChunkReader(source)
+        if encoding:
+            source = _DecodingReader(source, encoding)
+        self._load(source, encoding is not None)
+        self.max_token_length = max_token_length
+        self.prune_lines = True
+
+    def load_feed(self, max_token_length=None):
+        """ Prepare lexer for input pushed by feed and close.
+            Reading a token raises NeedInput when the input fed so far
+            ends in a middle of it, and it can be retried after feeding
+            more input. It works like load_stream for the rest.
+        """
+        self._load(_FeedReader(), False)
+        self.max_token_length = max_token_length
+        self.prune_lines = True
+
+    def feed(self, data):
+        """ Push data into lexer loaded by load_feed.
+        """
+        if data:
+            self.file.chunks.append(data)
+
+    def close(self):
+        """ Mark an end of input pushed into lexer loaded by load_feed.
         """
-        import StringIO
-        self._load(StringIO.StringIO(s), s is unicode)
+        self.file.closed = True
 
-    def _load(self, file, is_unicode):
+    def checkpoint(self):
+        """ Take a snapshot of lexer state which restore brings back.
+            Pending input of a string or fed by feed is kept in it,
+            and a file is rewound to its position on restore.
+            It raises ValueError for a file which can't tell a position
+            or decodes input, and for a stream.
+        """
+        state = self._copy_state(self.__dict__)
+        state["file_position"] = self._file_position()
+        return state
+
+    def restore(self, checkpoint):
+        """ Restore lexer state from a snapshot taken by checkpoint.
+            A snapshot can be restored any number of times.
+        """
+        state = self._copy_state(checkpoint)
+        position = state.pop("file_position")
+        if position is not None:
+            state["file"].seek(position)
+        self.__dict__.update(state)
+
+    def _file_position(self):
+        # get a position of file to rewind it or None without file
+        if self.file is None or isinstance(self.file, _FeedReader):
+            return None
+        if (self.is_unicode or
+            isinstance(self.file, (_ChunkReader, _PartialReader))):
+            raise ValueError("checkpoint can't rewind a stream")
+        try:
+            return self.file.tell()
+        except (AttributeError, IOError):
+            raise ValueError("checkpoint can't rewind a stream")
+
+    def _copy_state(self, state):
+        # copy mutable parts of lexer state
+        state = dict(state)
+        state["lines"] = state["lines"].copy()
+        state["group_stack"] = [list(g) for g in state["group_stack"]]
+        state["group_parts"] = list(state["group_parts"])
+        if isinstance(state["file"], _FeedReader):
+            state["file"] = state["file"].copy()
+        return state
+
+    def _load_mmap(self, file):
+        import mmap
+        if file.tell() != 0:
+            raise ValueError("use_mmap can't lex a file from its middle")
+        try:
+            m = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file cannot be mapped
+            m = str()
+        self.load_string(m)
+
+    def _load(self, file, is_unicode, buf=None):
+        # without file, buf holds a whole input
         self.file = file
         self.is_unicode = is_unicode
-        self.buf = u"" if is_unicode else str()
+        if buf is None:
+            self.buf = u"" if is_unicode else str()
+        else:
+            self.buf = buf
+        self.cbuf = self.grammar.classify_chars(self.buf[:0])
+        self.cbuf_base = 0
+        self.buf_base = 0
         self.buf_cur = 0
-        self.buf_remain = 0
-        self.line = 1
-        self.column = 1
+        self.buf_remain = len(self.buf)
+        self.lines = LineIndex(self.buf if file is None else None)
         self.group_stack = []
+        self.group_parts = []
+        self.scan_reach = 0
+        self.max_token_length = None
+        self.prune_lines = False
 
     def _load_buffer(self):
+        if self.file is None:
+            # classify a next window of a whole input
+            end = min(len(self.buf),
+                      max(self.cbuf_base + len(self.cbuf), self.buf_cur) +
+                      65536)
+            data = self.buf[self.buf_cur:end]
+            self.cbuf = self.grammar.classify_chars(data)
+            self.cbuf_base = self.buf_cur
+            return
         # shrink buffer
         if self.buf_cur >= 4096:
-            self.buf = self.buf[self.buf_cur:]
-            self.buf_cur = 0
-        # read into buffer
-        self.buf += self.file.read(4096)
+            self._shrink_buffer()
+        # read into buffer and classify characters of it
+        data = self.file.read(4096)
+        self.lines.add(data, self.buf_base + len(self.buf))
+        self.buf += data
+        self.cbuf += self.grammar.classify_chars(data)
         self.buf_remain = len(self.buf) - self.buf_cur
 
+    def _load_all(self):
+        # read all of remaining input into buffer
+        if self.file is None:
+            return
+        data = self.file.read()
+        self.lines.add(data, self.buf_base + len(self.buf))
+        self._shrink_buffer()
+        self.buf += data
+        self.cbuf += self.grammar.classify_chars(data)
+        self.buf_remain = len(self.buf)
+
+    def _shrink_buffer(self):
+        # drop consumed part of buffer.
+        # text of an open group is kept in group_parts.
+        if self.group_stack:
+            start = max(self.group_stack[0][1] - self.buf_base, 0)
+            self.group_parts.append(self.buf[start:self.buf_cur])
+        if self.prune_lines:
+            # keep lines of the last buffer which recent tokens are in
+            start = self.buf_base
+            if self.group_stack:
+                start = min(start, self.group_stack[0][1])
+            self.lines.prune(start)
+        self.buf = self.buf[self.buf_cur:]
+        self.cbuf = self.cbuf[self.buf_cur:]
+        self.buf_base += self.buf_cur
+        self.buf_cur = 0
+
+    def _seek(self, offset):
+        # move a cursor of a whole input to offset which is out of groups
+        self.cbuf = self.cbuf[:0]
+        self.cbuf_base = offset
+        self.buf_cur = offset
+        self.buf_remain = len(self.buf) - offset
+        self.group_stack = []
+        self.group_parts = []
+
+    def _skip_chars(self, pattern):
+        # consume characters of which classes don't match with pattern
+        cbuf_cur = self.buf_cur - self.cbuf_base
+        if cbuf_cur >= len(self.cbuf) and self.buf_remain > 0:
+            self._load_buffer()
+            cbuf_cur = self.buf_cur - self.cbuf_base
+        m = pattern.search(self.cbuf, cbuf_cur)
+        if m:
+            self._consume_buffer(m.start() - cbuf_cur)
+        elif cbuf_cur < len(self.cbuf):
+            self._consume_buffer(len(self.cbuf) - cbuf_cur)
+
+    def _group_lexeme(self, offset):
+        # get text from offset of the outermost group to cursor
+        start = max(offset - self.buf_base, 0)
+        lexeme = self.buf[start:self.buf_cur]
+        if self.group_parts:
+            self.group_parts.append(lexeme)
+            lexeme = lexeme[:0].join(self.group_parts)
+            self.group_parts = []
+        return lexeme
+
     def _consume_buffer(self, n):
-        # update line, column position
-        start = self.buf_cur
-        new_line_i = -1
-        while True:
-            i = self.buf.find("\n", start, self.buf_cur + n)
-            if i != -1:
-                start = new_line_i = i + 1
-                self.line += 1
-            else:
-                if new_line_i == -1:
-                    self.column += n
-                else:
-                    self.column = 1 + self.buf_cur + n - new_line_i
-                break
-        # manipulate buffer
-        if n < self.buf_remain:
-            self.buf_cur += n
-            self.buf_remain -= n
-        else:
-            self.buf = u"" if self.is_unicode else str()
-            self.buf_cur = 0
-            self.buf_remain = 0
+        self.buf_cur += n
+        self.buf_remain -= n
+
+    @property
+    def offset(self):
+        return self.buf_base + self.buf_cur
 
     @property
     def position(self):
-        return (self.line, self.column)
+        return self.lines.position(self.buf_base + self.buf_cur)
+
+    @property
+    def line(self):
+        position = self.position
+        return position[0] if position else None
+
+    @property
+    def column(self):
+        position = self.position
+        return position[1] if position else None
 
     def peek_token(self):
         """ peek next token and return it
             it doens't change any cursor state of lexer.
         """
+        hit_symbol, hit_cur, cur = self._match()
+        offset = self.buf_base + self.buf_cur
+        # a scan stopped by EOF depends on an end of input as well
+        reach = offset + cur
+        if cur >= self.buf_remain:
+            reach += 1
+        if reach > self.scan_reach:
+            self.scan_reach = reach
+        if hit_symbol:
+            lexeme = self.buf[self.buf_cur:self.buf_cur + hit_cur]
+            token = Token(hit_symbol, lexeme, offset, self.lines)
+        else:
+            if cur == 0:
+                token = Token(self.grammar.symbol_EOF, "", offset, self.lines)
+            else:
+                lexeme = self.buf[self.buf_cur:self.buf_cur + cur]
+                token = Token(self.grammar.symbol_Error, lexeme, offset,
+                              self.lines)
+        token.reach = self.scan_reach
+        return token
+
+    def _match(self):
+        # run DFA from a cursor and return a tuple of
+        # (accepted symbol, length of it, length of characters scanned)
         state = self.grammar.dfainit
         cur = 0
         hit_symbol = None
+        hit_cur = 0
+        cbuf = self.cbuf
+        cbuf_cur = self.buf_cur - self.cbuf_base
+        cbuf_remain = len(cbuf) - cbuf_cur
         while True:
-            if cur < self.buf_remain:           # peek 1 char
-                c = self.buf[self.buf_cur + cur]
+            if cur < cbuf_remain:               # peek 1 char class
+                c = cbuf[cbuf_cur + cur]
             else:
+                if (self.max_token_length is not None and
+                    cur >= self.max_token_length):
+                    return None, 0, cur         # if too long
                 self._load_buffer()
-                if cur < self.buf_remain:
-                    c = self.buf[self.buf_cur + cur]
+                cbuf = self.cbuf
+                cbuf_cur = self.buf_cur - self.cbuf_base
+                cbuf_remain = len(cbuf) - cbuf_cur
+                if cur < cbuf_remain:
+                    c = cbuf[cbuf_cur + cur]
                 else:
                     break                       # if EOF
             cur += 1
 
-            next_index = -1                     # find next state
-            c_ord = ord(c)
-            for (r_min, r_max), target_index, target in state.edges_lookup:
-                if c_ord >= r_min and c_ord <= r_max:
-                    next_index = target_index
-                    next_state = target
-                    break
+            edge = state.class_lookup[ord(c)]   # find next state
+            if edge is None:
+                next_index = -1
+            else:
+                next_index, next_state = edge
 
             if   next_index == -3:
                 continue
@@ -133,26 +639,35 @@ class Lexer(object):
                     hit_symbol = next_state.accept_symbol
                     hit_cur = cur
 
-        if hit_symbol:
-            lexeme = self.buf[self.buf_cur:self.buf_cur + hit_cur]
-            return Token(hit_symbol, lexeme, self.position)
-        else:
-            if cur == 0:
-                return Token(self.grammar.symbol_EOF, "", self.position)
-            else:
-                lexeme = self.buf[self.buf_cur:self.buf_cur + cur]
-                return Token(self.grammar.symbol_Error, lexeme, self.position)
+        return hit_symbol, hit_cur, cur
 
     def read_token(self):
         """ Read next token and return it.
             It moves a read cursor forward and it processes a lexical group.
         """
         while True:
+            # skip characters in a group that cannot change it
+            if (self.group_stack and
+                self.group_stack[-1][0].advance_mode ==
+                    grammar.AdvanceModeType.CHARACTER):
+                self._skip_chars(self.group_stack[-1][0].scan_pattern)
+
+            # give up a group getting too long
+            if (self.max_token_length is not None and self.group_stack and
+                self.offset - self.group_stack[0][1] >
+                    self.max_token_length):
+                offset = self.group_stack[0][1]
+                self.group_stack = []
+                token = Token(self.grammar.symbol_Error,
+                              self._group_lexeme(offset), offset, self.lines)
+                token.reach = self.scan_reach
+                return token
+
             token = self.peek_token()
 
             # check if a start of new group
             if token.symbol.type == grammar.SymbolType.GROUP_START:
-                symbol_group = [g for g in self.grammar.symbolgroups.itervalues() if g.start == token.symbol][0]
+                symbol_group = self.grammar.group_by_start[token.symbol.index]
                 if len(self.group_stack) == 0:
                     nest_group = True
                 else:
@@ -162,9 +677,10 @@ class Lexer(object):
 
             if nest_group:
                 # into nested
+                if len(self.group_stack) == 0:
+                    self.group_parts = []
                 self._consume_buffer(len(token.lexeme))
-                self.group_stack.append([symbol_group,
-                                         token.lexeme, token.position])
+                self.group_stack.append([symbol_group, token.offset])
 
             elif len(self.group_stack) == 0:
                 # token in plain
@@ -175,12 +691,13 @@ class Lexer(object):
                 # out of nested
                 pop = self.group_stack.pop()
                 if pop[0].ending_mode == grammar.EndingModeType.CLOSED:
-                    pop[1] = pop[1] + token.lexeme
                     self._consume_buffer(len(token.lexeme))
                 if len(self.group_stack) == 0:
-                    return Token(pop[0].container, pop[1], pop[2])
-                else:
-                    self.group_stack[-1][1] = self.group_stack[-1][1] + pop[1]
+                    token = Token(pop[0].container,
+                                  self._group_lexeme(pop[1]), pop[1],
+                                  self.lines)
+                    token.reach = self.scan_reach
+                    return token
 
             elif token.symbol == self.grammar.symbol_EOF:
                 # EOF in nested
@@ -190,10 +707,8 @@ class Lexer(object):
                 # token in nested
                 top = self.group_stack[-1]
                 if top[0].advance_mode == grammar.AdvanceModeType.TOKEN:
-                    top[1] = top[1] + token.lexeme
                     self._consume_buffer(len(token.lexeme))
                 else:
-                    top[1] = top[1] + token.lexeme[0]
                     self._consume_buffer(1)
 
     def read_token_all(self):
@@ -208,3 +723,191 @@ class Lexer(object):
                                      grammar.SymbolType.ERROR):
                 break
         return ret
+
+    def iter_tokens(self):
+        """ Generate tokens until EOF or an error like read_token_all
+            without building a whole list of them.
+        """
+        while True:
+            token = self.read_token()
+            yield token
+            if token.symbol.type in (grammar.SymbolType.END_OF_FILE,
+                                     grammar.SymbolType.ERROR):
+                return
+
+    def tokenize_columnar(self):
+        """ Read all tokens until EOF or an error into TokenColumns
+            which keeps them in compact arrays with the source text.
+        """
+        self._load_all()
+        columns = TokenColumns(self.grammar, self.buf, self.lines,
+                               self.buf_base)
+        symbols = columns.symbols
+        offsets = columns.offsets
+        lengths = columns.lengths
+        source_offset = columns.source_offset
+        GROUP_START = grammar.SymbolType.GROUP_START
+        while True:
+            # a plain token is appended without making Token and lexeme
+            hit_symbol, hit_cur, cur = self._match()
+            if hit_symbol is not None and hit_symbol.type != GROUP_START:
+                symbols.append(hit_symbol.index)
+                offsets.append(self.buf_base + self.buf_cur - source_offset)
+                lengths.append(hit_cur)
+                self._consume_buffer(hit_cur)
+                continue
+
+            # a group, EOF and an error are read by read_token
+            token = self.read_token()
+            columns.append(token.symbol.index,
+                           token.offset - source_offset, len(token.lexeme))
+            if token.symbol.type in (grammar.SymbolType.END_OF_FILE,
+                                     grammar.SymbolType.ERROR):
+                return columns
+
+    def tokenize_parallel(self, processes=None, chunk_size=None):
+        """ Read all tokens into TokenColumns like tokenize_columnar
+            but lex chunks of input split at newlines in processes.
+            A chunk boundary may be in a middle of a token or a group,
+            so tokens are lexed again from the end of a chunk until
+            a token starts where a token of following chunk starts.
+        """
+        import multiprocessing
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self._load_all()
+        buf = self.buf
+        start = self.buf_cur
+        if chunk_size is None:
+            chunk_size = max((len(buf) - start) // (processes * 4), 65536)
+
+        # split input at newlines
+        starts = [start]
+        while True:
+            i = buf.find("\n", starts[-1] + chunk_size)
+            if i == -1 or i + 1 >= len(buf):
+                break
+            starts.append(i + 1)
+        if processes <= 1 or len(starts) == 1:
+            return self.tokenize_columnar()
+        tasks = zip(starts, starts[1:] + [len(buf)])
+
+        pool = multiprocessing.Pool(processes, _init_parallel,
+                                    (type(self), self.grammar, buf))
+        try:
+            results = pool.map(_tokenize_range, tasks)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+        def find(offset):
+            # find a chunk token starting at offset
+            k = bisect.bisect_right(starts, offset) - 1
+            offsets = results[k][1]
+            j = bisect.bisect_left(offsets, offset)
+            if j < len(offsets) and offsets[j] == offset:
+                return k, j
+            return None
+
+        columns = TokenColumns(self.grammar, buf, self.lines, self.buf_base)
+        lexer = None
+        k, j = 0, 0
+        while True:
+            symbols, offsets, lengths, stop = results[k]
+            columns.symbols.extend(symbols[j:])
+            columns.offsets.extend(offsets[j:])
+            columns.lengths.extend(lengths[j:])
+            if stop is None:
+                break
+            found = find(stop)
+            if found is None:
+                # chunks disagree at a seam, so lex it again
+                if lexer is None:
+                    lexer = type(self)(self.grammar)
+                    lexer.load_string(buf)
+                lexer._seek(stop)
+                while found is None:
+                    token = lexer.read_token()
+                    columns.append(token.symbol.index, token.offset,
+                                   len(token.lexeme))
+                    if token.symbol.type in (grammar.SymbolType.END_OF_FILE,
+                                             grammar.SymbolType.ERROR):
+                        break
+                    stop = lexer.offset
+                    found = find(stop)
+                if found is None:
+                    break
+            k, j = found
+
+        self._consume_buffer(columns.offsets[-1] + columns.lengths[-1] -
+                             self.buf_cur)
+        return columns
+
+    def relex(self, s, tokens, edit):
+        """ Lex s edited from a text of tokens and return new tokens.
+            Edit is a tuple of (offset, removed length, inserted text).
+            Old tokens are kept while no scan to read them examined
+            the edit, and lexing restarts at the end of them. It stops
+            as soon as a new token starts where an old token starts
+            after the edit. Old tokens after that are reused and their
+            offsets are shifted in place.
+            Tokens not read by Lexer are not reused at all.
+        """
+        offset, removed, inserted = edit
+        delta = len(inserted) - removed
+        edit_end = offset + len(inserted)
+        self.load_string(s)
+
+        # find the first token whose reach is beyond the edit.
+        # reach of tokens never decreases.
+        if tokens and (tokens[0].reach is None or tokens[-1].reach is None):
+            tokens = []
+        lo, hi = 0, len(tokens)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tokens[mid].reach <= offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        restart = lo
+
+        # a last token of EOF or an error ends lexing and EOF may be
+        # in an open group, so lex it again from an end of a previous one
+        if (restart == len(tokens) > 0 and
+            tokens[-1].symbol.type in (grammar.SymbolType.END_OF_FILE,
+                                       grammar.SymbolType.ERROR)):
+            restart -= 1
+
+        ret = tokens[:restart]
+        if restart > 0:
+            last = tokens[restart - 1]
+            self._seek(last.offset + len(last.lexeme))
+            self.scan_reach = last.reach
+        old = restart
+        while True:
+            token = self.read_token()
+            if token.offset >= edit_end:
+                while (old < len(tokens) and
+                       tokens[old].offset + delta < token.offset):
+                    old += 1
+                if (old < len(tokens) and
+                    tokens[old].offset + delta == token.offset):
+                    # resynchronized with old tokens
+                    reach = self.scan_reach
+                    self._seek(len(self.buf))
+                    reused = tokens[old:]
+                    for t in reused:
+                        t.offset += delta
+                        t.reach += delta
+                        t.lines = self.lines
+                    for t in reused:
+                        if t.reach >= reach:
+                            break
+                        t.reach = reach
+                    ret.extend(reused)
+                    return ret
+            ret.append(token)
+            if token.symbol.type in (grammar.SymbolType.END_OF_FILE,
+                                     grammar.SymbolType.ERROR):
+                return ret
@@ -2,7 +2,7 @@
 import sys
 import grammar
 from grammar import SymbolType, LALRActionType
-from lexer import Lexer, Token
+from lexer import Lexer, Token, TokenStream, NeedInput
 
 
 class ParseResultType:
@@ -11,6 +11,7 @@ class ParseResultType:
     REDUCE = 3
     REDUCE_ELIMINATED = 4
     ERROR = 5
+    NEED_INPUT = 6
 
 
 class ParseItem(object):
@@ -21,11 +22,14 @@ class ParseItem(object):
        for a bottom-up evaluation.
     """
 
+    __slots__ = ("state", "production", "token", "data", "handles")
+
     def __init__(self, state, production=None, token=None):
         self.state = state              # grammar.LALRState
         self.production = production    # grammar.Production
         self.token = token              # lexer.Token
         self.data = None                # for saving an user-value
+        self.handles = None             # items reduced to a production
 
     def __str__(self):
         if self.production:
@@ -35,6 +39,12 @@ class ParseItem(object):
         else:
             return "S={0}".format(self.state.index)
 
+    def copy(self):
+        item = ParseItem(self.state, self.production, self.token)
+        item.data = self.data
+        item.handles = self.handles
+        return item
+
 
 class ParseErrorType:
     LEXICAL_ERROR = 1
@@ -43,33 +53,50 @@ class ParseErrorType:
 
 
 class ParseErrorInfo(object):
-    def __init__(self, type, position, state, token, expected_symbols):
+    def __init__(self, type, offset, state, token, expected_symbols,
+                 lines=None):
         self.type = type
-        self.position = position
+        self.offset = offset
         self.state = state
         self.token = token
         self.expected_symbols = expected_symbols
+        self.lines = lines
+
+    @property
+    def position(self):
+        if self.lines is None:
+            return None
+        return self.lines.position(self.offset)
 
     def __str__(self):
+        # a position is unknown without lines or after they're pruned
+        if self.type in (ParseErrorType.LEXICAL_ERROR,
+                         ParseErrorType.SYNTAX_ERROR):
+            position = self.token.position
+        else:
+            position = self.position
+        line, column = position or ("?", "?")
         if   self.type == ParseErrorType.LEXICAL_ERROR:
             return "LexicalError({0}:{1}) Lexeme='{1}'".format(
-                self.token.position[0], self.token.position[1],
-                self.token.lexeme)
+                line, column, self.token.lexeme)
         elif self.type == ParseErrorType.SYNTAX_ERROR:
             return "SyntaxError({0}:{1}) Token={1} ExpectedTokens=[{2}]".format(
-                self.token.position[0], self.token.position[1],
-                self.token,
+                line, column, self.token,
                 ", ".join([s.id for s in self.expected_symbols]))
         else:
             return "InternalError({0}:{1}) State={1}".format(
-                self.position[0], self.position[1], self.state.index)
+                line, column, self.state.index)
 
 
 class Reduction(object):
     """Reduction is a result by a reduction step of parsing.
        It contains a reduced production rule, derived head and handles.
+       Parser reuses one Reduction for every reduction step,
+       so it's valid only until a next step.
     """
 
+    __slots__ = ("production", "head", "handles")
+
     def __init__(self, production, head, handles):
         self.production = production
         self.head = head
@@ -88,6 +115,8 @@ class ProductionHandler(object):
        and a corresponding handler is called.
     """
 
+    handle_shift = False
+
     def __init__(self, handler_map, grammar=None):
         if grammar:
             # If a grammar is provided, a key of handler_map could be string.
@@ -125,6 +154,8 @@ class Parser(object):
     def __init__(self, grammar):
         self.grammar = grammar
         self.trim_reduction = False
+        self.error_recovery = False
+        self.sync_symbols = ()
 
     def load_lexer(self, lexer):
         self.lexer = lexer
@@ -133,11 +164,16 @@ class Parser(object):
         self.token = Token(None, "", None)
         self.token_used = True
         self.error_info = None
+        self.errors = []
+        self.recovering = False
+        self.recover_token = None
         self.reduction = None
+        self._reduction = Reduction(None, None, None)
+        self.feed_handler = None
 
-    def load_file(self, file_or_path, encoding=None):
+    def load_file(self, file_or_path, encoding=None, use_mmap=False):
         lexer = Lexer(self.grammar)
-        lexer.load_file(file_or_path, encoding)
+        lexer.load_file(file_or_path, encoding, use_mmap)
         self.load_lexer(lexer)
 
     def load_string(self, s):
@@ -145,6 +181,78 @@ class Parser(object):
         lexer.load_string(s)
         self.load_lexer(lexer)
 
+    def load_stream(self, source, encoding=None, max_token_length=None):
+        lexer = Lexer(self.grammar)
+        lexer.load_stream(source, encoding, max_token_length)
+        self.load_lexer(lexer)
+
+    def load_tokens(self, tokens):
+        self.load_lexer(TokenStream(self.grammar, tokens))
+
+    def load_feed(self, handler=None, max_token_length=None):
+        """ Prepare parser for input pushed by feed and close.
+            Handler is invoked like parse_all while parsing fed input.
+        """
+        lexer = Lexer(self.grammar)
+        lexer.load_feed(max_token_length)
+        self.load_lexer(lexer)
+        self.feed_handler = handler
+
+    def feed(self, data):
+        """ Push data and parse as far as it allows.
+            It returns NEED_INPUT if more input is needed,
+            otherwise ACCEPT or ERROR.
+        """
+        self.lexer.feed(data)
+        return self._parse_fed()
+
+    def close(self):
+        """ Mark an end of input and finish parsing.
+        """
+        self.lexer.close()
+        return self._parse_fed()
+
+    _checkpoint_attrs = ("lexer", "state", "token", "token_used",
+                         "error_info", "recovering", "recover_token",
+                         "feed_handler")
+
+    def checkpoint(self):
+        """ Take a snapshot of parser state with a state of its lexer.
+            Restoring it resumes parsing from there, so a common prefix of
+            inputs is parsed once, e.g. by feeding a prefix and restoring
+            a snapshot after it before feeding each of suffixes.
+            Data of stack items are shared with a snapshot, not copied.
+            A lexer reading a stream raises ValueError like
+            Lexer.checkpoint.
+        """
+        state = dict((name, getattr(self, name))
+                     for name in self._checkpoint_attrs)
+        state["stack"] = [item.copy() for item in self.stack]
+        state["errors"] = list(self.errors)
+        state["lexer_state"] = self.lexer.checkpoint()
+        return state
+
+    def restore(self, checkpoint):
+        """ Restore parser state from a snapshot taken by checkpoint.
+            A snapshot can be restored any number of times.
+        """
+        for name in self._checkpoint_attrs:
+            setattr(self, name, checkpoint[name])
+        self.stack = [item.copy() for item in checkpoint["stack"]]
+        self.errors = list(checkpoint["errors"])
+        self.lexer.restore(checkpoint["lexer_state"])
+
+    def _parse_fed(self):
+        try:
+            if self.recovering and not self._sync():
+                return ParseResultType.ERROR
+            return self.parse_all(self.feed_handler)
+        except NeedInput:
+            # it stopped at reading a token. the top of stack has a state.
+            self.state = self.stack[-1].state
+            self.token_used = True
+            return ParseResultType.NEED_INPUT
+
     def _read_token(self):
         while True:
             token = self.lexer.read_token()
@@ -171,20 +279,29 @@ class Parser(object):
         """ Perform 1 step parsing which is one of shift, reduce, accept, error.
             If you are familar with shift-reduce parsing,
             it is a function that you're finding.
+            A state which reduces by one production on any lookahead
+            reduces without reading a next token.
         """
+        grm = self.grammar
+        action = 0
         if self.token_used:
-            self.token = self._read_token()
-            self.token_used = False
-
-        if self.token.symbol.type == SymbolType.ERROR:
-            # Tokenizer error_info
-            self.error_info = ParseErrorInfo(ParseErrorType.LEXICAL_ERROR,
-                                             self.position,
-                                             self.state, self.token, None)
-            return ParseResultType.ERROR
-
-        action = self.state.actions.get(self.token.symbol.index, None)
-        if action is None:
+            action = grm.lalr_default_reductions[self.state.index]
+            if action == 0:
+                self.token = self._read_token()
+                self.token_used = False
+
+        if action == 0:
+            if self.token.symbol.type == SymbolType.ERROR:
+                # Tokenizer error_info
+                self.error_info = ParseErrorInfo(
+                    ParseErrorType.LEXICAL_ERROR, self.lexer.offset,
+                    self.state, self.token, None, self.lexer.lines)
+                return ParseResultType.ERROR
+
+            action = grm.lalr_table[self.state.index * grm.lalr_width +
+                                    self.token.symbol.index]
+
+        if action == 0:
             # Syntax error_info by an unexpected symbol
             expected_symbols = []
             for action in self.state.actions.itervalues():
@@ -194,71 +311,68 @@ class Parser(object):
                                           SymbolType.GROUP_END):
                     expected_symbols.append(action.symbol)
             self.error_info = ParseErrorInfo(ParseErrorType.SYNTAX_ERROR,
-                                             self.position,
+                                             self.lexer.offset,
                                              self.state, self.token,
-                                             expected_symbols)
+                                             expected_symbols,
+                                             self.lexer.lines)
             return ParseResultType.ERROR
 
-        if   action.type == LALRActionType.SHIFT:
+        if   action > 0:
             # Shift
-            self.state = action.target
+            self.state = grm.lalrstates[action - 1]
             item = ParseItem(self.state, token=self.token)
             self.stack.append(item)
             self.token_used = True
             return ParseResultType.SHIFT
 
-        elif action.type == LALRActionType.REDUCE:
+        elif action < -1:
             # Reduce/Production
-            production = action.target
-            handles = []
-            trimmed = (self.trim_reduction and
-                       len(production.handles) == 1 and
+            production = grm.productions[-action - 2]
+            length = grm.production_lengths[production.index]
+            trimmed = (self.trim_reduction and length == 1 and
                        production.handles[0].type == SymbolType.NON_TERMINAL)
             if trimmed:
+                handles = []
                 top_state = self.stack[-2].state
             else:
-                for i in xrange(len(production.handles)):
-                    handles.insert(0, self.stack.pop(-1))
+                handles = self.stack[len(self.stack) - length:]
+                del self.stack[len(self.stack) - length:]
                 top_state = self.stack[-1].state
 
             # Reduce/Goto
-            goto_action = top_state.actions[production.head.index]
-            if goto_action.type != LALRActionType.GOTO:
+            goto = grm.lalr_table[top_state.index * grm.lalr_width +
+                                  grm.production_heads[production.index]]
+            if goto <= 0:
                 self.error_info = ParseErrorInfo(ParseErrorType.INTERNAL_ERROR,
-                                                 self.position,
-                                                 self.state, self.token, None)
-                return ParseResult.ERROR
-            self.state = goto_action.target
+                                                 self.lexer.offset,
+                                                 self.state, self.token, None,
+                                                 self.lexer.lines)
+                return ParseResultType.ERROR
+            self.state = grm.lalrstates[goto - 1]
             if trimmed:
                 item = self.stack[-1]
                 item.state = self.state
                 item.production = production
                 return ParseResultType.REDUCE_ELIMINATED
             else:
-                item = ParseItem(self.state, production=production)
+                item = ParseItem(self.state, production)
                 self.stack.append(item)
                 item.handles = handles
-                self.reduction = Reduction(production, item, handles)
+                self.reduction = self._view_reduction(production, item,
+                                                      handles)
                 return ParseResultType.REDUCE
 
-        elif action.type == LALRActionType.GOTO:
-            # Goto
-            self.error_info = ParseErrorInfo(ParseErrorType.INTERNAL_ERROR,
-                                             self.position,
-                                             self.state, self.token, None)
-            return ParseResultType.ERROR
-
-        elif action.type == LALRActionType.ACCEPT:
+        else:
             # Accept
             self.result = self.stack[-1]
             return ParseResultType.ACCEPT
 
-        else:
-            # Internal Error
-            self.error_info = ParseErrorInfo(ParseErrorType.INTERNAL_ERROR,
-                                             self.position,
-                                             self.state, self.token, None)
-            return ParseResultType.ERROR
+    def _view_reduction(self, production, head, handles):
+        r = self._reduction
+        r.production = production
+        r.head = head
+        r.handles = handles
+        return r
 
     def parse_reduce(self):
         """ Perform multiple parse-steps until accept or reduce or error.
@@ -273,11 +387,161 @@ class Parser(object):
     def parse_all(self, handler=None):
         """ Perform all parse-steps until accept or error.
             In any parsing steps, handler will be invoked with a parsing state.
+            If handler has handle_shift attribute of False, it is invoked
+            only on reduce, accept and error and parsing runs in a fused
+            loop instead of calling parse_step.
+            With error_recovery, parsing goes on after errors which are
+            collected in errors, and it returns ERROR if there is any.
         """
+        fused = not (handler and getattr(handler, "handle_shift", True))
         while True:
-            ret = self.parse_step()
+            if fused:
+                ret = self._parse_fused(handler)
+            else:
+                ret = self.parse_step()
             if handler:
                 handler(ret, self)
+            if ret == ParseResultType.ERROR and self._recover():
+                continue
             if ret in (ParseResultType.ACCEPT,
                        ParseResultType.ERROR):
-                return ret
+                break
+        if self.errors:
+            return ParseResultType.ERROR
+        return ret
+
+    def _recover(self):
+        # keep an error and recover from it in panic-mode
+        if not self.error_recovery:
+            return False
+        self.errors.append(self.error_info)
+        self.recovering = True
+        return self._sync()
+
+    def _sync(self):
+        # skip tokens until a sync symbol which a state in stack has
+        # an action on, and pop states above it.
+        grm = self.grammar
+        sync = set(grm.lalr_sync_symbols)
+        for s in self.sync_symbols:
+            if isinstance(s, str) or isinstance(s, unicode):
+                s = grm.get_symbol(s)
+            sync.add(s.index)
+        while True:
+            if self.token_used:
+                self.token = self._read_token()
+                self.token_used = False
+            token = self.token
+            if token.symbol.type == SymbolType.ERROR:
+                if token is not self.errors[-1].token:
+                    self.errors.append(ParseErrorInfo(
+                        ParseErrorType.LEXICAL_ERROR, self.lexer.offset,
+                        self.state, token, None, self.lexer.lines))
+            elif (token.symbol.index in sync and
+                  token is not self.recover_token):
+                for i in xrange(len(self.stack) - 1, -1, -1):
+                    if grm.lalr_table[self.stack[i].state.index *
+                                      grm.lalr_width +
+                                      token.symbol.index] != 0:
+                        del self.stack[i + 1:]
+                        self.state = self.stack[-1].state
+                        self.recovering = False
+                        self.recover_token = token
+                        return True
+            if token.symbol.type == SymbolType.END_OF_FILE:
+                self.recovering = False
+                return False
+            self.token_used = True
+
+    def _parse_fused(self, handler):
+        # shift and reduce until accept or error with local variables.
+        # an accept or an error is left to parse_step.
+        grm = self.grammar
+        table = grm.lalr_table
+        width = grm.lalr_width
+        lengths = grm.production_lengths
+        heads = grm.production_heads
+        default_reductions = grm.lalr_default_reductions
+        productions = grm.productions
+        states = grm.lalrstates
+        unit_chains = grm.lalr_unit_chains
+        stack = self.stack
+        trim_reduction = self.trim_reduction
+        read_token = self._read_token
+        view_reduction = self._view_reduction
+        NON_TERMINAL = SymbolType.NON_TERMINAL
+        REDUCE = ParseResultType.REDUCE
+
+        # token is None until a lookahead is needed
+        state_index = self.state.index
+        token = None if self.token_used else self.token
+        while True:
+            if token is None:
+                action = default_reductions[state_index]
+                if action == 0:
+                    token = read_token()
+                    action = table[state_index * width + token.symbol.index]
+            else:
+                action = table[state_index * width + token.symbol.index]
+            if action > 0:
+                # Shift
+                state_index = action - 1
+                stack.append(ParseItem(states[state_index], None, token))
+                token = None
+
+            elif action < -1:
+                # Reduce
+                p = -action - 2
+                production = productions[p]
+                length = lengths[p]
+                if (trim_reduction and length == 1 and
+                    production.handles[0].type == NON_TERMINAL):
+                    item = stack[-1]
+                    goto = table[stack[-2].state.index * width + heads[p]]
+                    state_index = goto - 1
+                    item.state = states[state_index]
+                    item.production = production
+                    continue
+
+                handles = stack[len(stack) - length:]
+                del stack[len(stack) - length:]
+                goto_index = stack[-1].state.index * width + heads[p]
+                goto = table[goto_index]
+                if goto <= 0:
+                    break
+                state_index = goto - 1
+                chain = None
+                if trim_reduction and token is not None:
+                    # jump over following reductions by unit productions
+                    chain = unit_chains[goto_index * width +
+                                        token.symbol.index]
+                    if chain:
+                        state_index = chain[0]
+                item = ParseItem(states[state_index], production)
+                item.handles = handles
+                stack.append(item)
+                if handler:
+                    self.state = item.state
+                    self.token_used = token is None
+                    if token is not None:
+                        self.token = token
+                    self.reduction = view_reduction(production, item,
+                                                    handles)
+                    handler(REDUCE, self)
+                if chain:
+                    item.production = chain[1]
+
+            else:
+                break
+
+        self.state = states[state_index]
+        self.token_used = token is None
+        if token is not None:
+            self.token = token
+        if action < -1:
+            self.error_info = ParseErrorInfo(ParseErrorType.INTERNAL_ERROR,
+                                             self.lexer.offset,
+                                             self.state, self.token, None,
+                                             self.lexer.lines)
+            return ParseResultType.ERROR
+        return self.parse_step()
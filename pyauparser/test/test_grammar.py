@@ -1,4 +1,5 @@
 import sys
+import marshal
 import unittest
 import codecs
 import StringIO
@@ -18,6 +19,134 @@ class TestGrammar(unittest.TestCase):
         self.assertEqual(len(self.grammar.dfastates), 11)
         self.assertEqual(len(self.grammar.lalrstates), 19)
 
+    def test_char_classes(self):
+        # a transition by a character class should be same as a transition
+        # found by scanning edges of a state.
+        g = self.grammar
+        for s in g.dfastates.itervalues():
+            for c in range(0, 0x3100):
+                edge = s.class_lookup[g.get_char_class(c)]
+                expected = [(t_i, t) for (r_min, r_max), t_i, t
+                            in s.edges_lookup if r_min <= c <= r_max]
+                self.assertEqual(edge, expected[0] if expected else None)
+        self.assertEqual(g.classify_chars("1+a"),
+                         g.classify_chars(u"1+a"))
+
+    def test_lalr_table(self):
+        # an entry of the table should decode to an action of a state.
+        g = self.grammar
+        for s in g.lalrstates.itervalues():
+            for symbol in g.symbols.itervalues():
+                a = g.lalr_table[s.index * g.lalr_width + symbol.index]
+                action = s.actions.get(symbol.index)
+                if a == 0:
+                    self.assertEqual(action, None)
+                elif a > 0:
+                    self.assertEqual(action.target.index, a - 1)
+                elif a == -1:
+                    self.assertEqual(action.type,
+                                     pyauparser.LALRActionType.ACCEPT)
+                else:
+                    self.assertEqual(action.type,
+                                     pyauparser.LALRActionType.REDUCE)
+                    self.assertEqual(action.target.index, -a - 2)
+        for p in g.productions.itervalues():
+            self.assertEqual(g.production_lengths[p.index], len(p.handles))
+            self.assertEqual(g.production_heads[p.index], p.head.index)
+
+    def test_minimize_dfa(self):
+        g1 = pyauparser.Grammar.load_file("Data/group.egt")
+        g2 = pyauparser.Grammar.load_file("Data/group.egt")
+        stats = g2.minimize_dfa()
+        self.assertEqual(stats["states"], (40, 34))
+        self.assertEqual(stats["states"][1], len(g2.dfastates))
+        self.assertTrue(stats["edges"][1] < stats["edges"][0])
+        for s in ["a = b, c = \"d\\\"\", e = <html> f </html>",
+                  "a /* b */ = // c\n (* d (* e *) *) [* f [* *] *] g",
+                  "a = \"b", "a = <html> (* b"]:
+            tokens = []
+            for g in (g1, g2):
+                lexer = pyauparser.Lexer(g)
+                lexer.load_string(s)
+                tokens.append([(t.symbol.index, t.lexeme, t.offset)
+                               for t in lexer.read_token_all()])
+            self.assertEqual(tokens[0], tokens[1])
+
+    def test_cache(self):
+        import os
+        import shutil
+        import tempfile
+        cache_dir = os.path.join(tempfile.mkdtemp(), "cache")
+        try:
+            g1 = pyauparser.Grammar.load_file("Data/group.egt", cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            g2 = pyauparser.Grammar.load_file("Data/group.egt", cache_dir)
+            g3 = pyauparser.Grammar.load_file("Data/operator.egt", cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+            f1 = StringIO.StringIO()
+            f2 = StringIO.StringIO()
+            g1.export_to_txt(f1)
+            g2.export_to_txt(f2)
+            self.assertEqual(f1.getvalue(), f2.getvalue())
+            self.assertEqual(g2.lalr_table, g1.lalr_table)
+            self.assertEqual(g3.lalr_table, self.grammar.lalr_table)
+            pyauparser.parse_string(g3, "-2*(3+4)")
+            tree = pyauparser.parse_string_to_tree(g2, "a = <html> b </html>")
+            node = tree.childs[0].childs[0].childs[2].childs[0]
+            self.assertEqual(node.token.lexeme, "<html> b </html>")
+
+            # tables are plain values and a broken cache is rebuilt
+            for name in os.listdir(cache_dir):
+                path = os.path.join(cache_dir, name)
+                with open(path, "rb") as f:
+                    self.assertTrue(isinstance(marshal.loads(f.read()), dict))
+                with open(path, "wb") as f:
+                    f.write("broken")
+            g4 = pyauparser.Grammar.load_file("Data/operator.egt", cache_dir)
+            self.assertEqual(g4.lalr_table, self.grammar.lalr_table)
+
+            # minimized and compressed grammars are cached too
+            g = pyauparser.Grammar.load_file("Data/group.egt",
+                                             minimize_dfa=True)
+            for i in range(2):
+                g5 = pyauparser.Grammar.load_file(
+                    "Data/group.egt", cache_dir, minimize_dfa=True,
+                    compress_lalr=True)
+                self.assertEqual(len(g5.dfastates), len(g.dfastates))
+                self.assertEqual(list(g5.lalr_table), list(g1.lalr_table))
+                tree = pyauparser.parse_string_to_tree(
+                    g5, "a = <html> b </html>")
+                node = tree.childs[0].childs[0].childs[2].childs[0]
+                self.assertEqual(node.token.lexeme, "<html> b </html>")
+            self.assertEqual(len(os.listdir(cache_dir)), 3)
+        finally:
+            shutil.rmtree(os.path.dirname(cache_dir), True)
+
+    def test_compress_lalr_table(self):
+        g = pyauparser.Grammar.load_file("Data/operator.egt",
+                                         compress_lalr=True)
+        self.assertEqual(g.compress_lalr_table()["entries"][0],
+                         len(self.grammar.lalr_table))
+        self.assertEqual(list(g.lalr_table), list(self.grammar.lalr_table))
+        gf1 = StringIO.StringIO()
+        self.grammar.export_to_txt(gf1)
+        gf2 = StringIO.StringIO()
+        g.export_to_txt(gf2)
+        self.assertEqual(gf1.getvalue(), gf2.getvalue())
+        tree1 = pyauparser.parse_string_to_tree(self.grammar, "-2*(3+4)-5")
+        tree2 = pyauparser.parse_string_to_tree(g, "-2*(3+4)-5")
+        self.assertEqual(tree2.production.index, tree1.production.index)
+        self.assertEqual(
+            [c.production.index for c in tree2.childs if c.production],
+            [c.production.index for c in tree1.childs if c.production])
+        try:
+            pyauparser.parse_string(g, "1+*2")
+            self.fail()
+        except pyauparser.ParseError as e:
+            self.assertEqual(sorted(s.name for s in
+                                    e.error_info.expected_symbols),
+                             ["(", "-", "Num"])
+
     def test_export(self):
         with open("temp_operator_grammar.py", "wb") as f:
             self.grammar.export_to_py(f)
@@ -29,5 +158,19 @@ class TestGrammar(unittest.TestCase):
         grammar2.export_to_txt(gf2)
         self.assertEqual(gf1.getvalue(), gf2.getvalue())
 
+    def test_export_tables(self):
+        # tables of a grammar constructed from exported tables should be
+        # same as ones of an original grammar.
+        g = pyauparser.Grammar.load_file("Data/group.egt")
+        f = StringIO.StringIO()
+        g.export_to_py(f)
+        module = {}
+        exec f.getvalue() in module
+        g2 = module["load"]()
+        self.assertEqual(g2._export_tables(), g._export_tables())
+        tree = pyauparser.parse_string_to_tree(g2, "a = <html> b </html>")
+        node = tree.childs[0].childs[0].childs[2].childs[0]
+        self.assertEqual(node.token.lexeme, "<html> b </html>")
+
 if __name__ == '__main__':
     unittest.main()
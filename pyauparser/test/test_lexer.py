@@ -1,17 +1,79 @@
+import os
+import imp
 import sys
+import random
+import shutil
+import tempfile
+import threading
 import unittest
+import StringIO
 import pyauparser
 
+def make_literal_grammar(literals):
+    # build a grammar of which terminals are literals from a trie of them
+    # and a start symbol is a list of the terminals
+    grm = pyauparser.Grammar()
+    grm.symbols = {0: pyauparser.Symbol(0, u"EOF", pyauparser.SymbolType.END_OF_FILE),
+                   1: pyauparser.Symbol(1, u"Error", pyauparser.SymbolType.ERROR)}
+    chars = sorted(set("".join(literals)))
+    grm.charsets = dict((i, pyauparser.CharacterSet(i, 0, [(ord(c), ord(c))]))
+                        for i, c in enumerate(chars))
+    grm.dfastates = {0: pyauparser.DFAState(0, None, [])}
+    trie = {"": 0}
+    for literal in literals:
+        symbol = pyauparser.Symbol(len(grm.symbols),
+                                   unicode(literal.encode("unicode-escape")),
+                                   pyauparser.SymbolType.TERMINAL)
+        grm.symbols[symbol.index] = symbol
+        for i in xrange(1, len(literal) + 1):
+            if literal[:i] not in trie:
+                state = pyauparser.DFAState(len(grm.dfastates), None, [])
+                grm.dfastates[state.index] = state
+                trie[literal[:i]] = state.index
+                grm.dfastates[trie[literal[:i - 1]]].edges.append(
+                    pyauparser.DFAEdge(chars.index(literal[i - 1]),
+                                       state.index))
+        grm.dfastates[trie[literal]].accept_symbol = symbol.index
+
+    # <List> ::= <List> T | T
+    terminals = sorted(grm.symbols)[2:]
+    head = len(grm.symbols)
+    grm.symbols[head] = pyauparser.Symbol(head, u"List",
+                                          pyauparser.SymbolType.NON_TERMINAL)
+    shift, reduce_ = pyauparser.LALRActionType.SHIFT, pyauparser.LALRActionType.REDUCE
+    grm.lalrstates = {
+        0: pyauparser.LALRState(0, {head: pyauparser.LALRAction(
+            head, pyauparser.LALRActionType.GOTO, 1)}),
+        1: pyauparser.LALRState(1, {0: pyauparser.LALRAction(
+            0, pyauparser.LALRActionType.ACCEPT, None)})}
+    for t in terminals:
+        for handles, state in (((t,), 0), ((head, t), 1)):
+            p = pyauparser.Production(len(grm.productions), head, handles)
+            grm.productions[p.index] = p
+            target = pyauparser.LALRState(len(grm.lalrstates), dict(
+                (s, pyauparser.LALRAction(s, reduce_, p.index))
+                for s in [0] + terminals))
+            grm.lalrstates[target.index] = target
+            grm.lalrstates[state].actions[t] = pyauparser.LALRAction(
+                t, shift, target.index)
+    grm._process_after_load()
+    return grm
+
 class TestLexer(unittest.TestCase):
 
     def setUp(self):
         self.grammar_operator = pyauparser.Grammar.load_file("data/operator.egt")
         self.grammar_group = pyauparser.Grammar.load_file("Data/group.egt")
+        self.grammar_literal = make_literal_grammar(
+            ["a", "b", "c", "d", "X", "abcd"])
+
+    def create_lexer(self, grammar):
+        return pyauparser.Lexer(grammar)
 
     def test_operator(self):
         src = "1+2*(3/4)"
         dst = ""
-        lexer = pyauparser.Lexer(self.grammar_operator)
+        lexer = self.create_lexer(self.grammar_operator)
         lexer.load_string(src)
         while True:
             token = lexer.read_token()
@@ -22,8 +84,18 @@ class TestLexer(unittest.TestCase):
             dst += token.lexeme
         self.assertEqual(src, dst)
 
+    def test_unicode(self):
+        # characters beyond latin-1 get character classes by a bisect
+        # on class boundaries, and unknown ones get the error class
+        lexer = self.create_lexer(self.grammar_group)
+        lexer.load_string(u"a\u3000=\u2028b\u00a0,\uac00")
+        tokens = lexer.read_token_all()
+        self.assertEqual([t.symbol.name for t in tokens],
+                         [u'ID', u'Whitespace', u'=', u'NewLine',
+                          u'ID', u'Whitespace', u',', u'Error'])
+
     def test_comment(self):
-        lexer = pyauparser.Lexer(self.grammar_group)
+        lexer = self.create_lexer(self.grammar_group)
         lexer.load_string(
             """
                 a // Comment
@@ -37,7 +109,7 @@ class TestLexer(unittest.TestCase):
         self.assertEqual(terminals, [u'a', u'b', u'c', u'd'])
 
     def test_html(self):
-        lexer = pyauparser.Lexer(self.grammar_group)
+        lexer = self.create_lexer(self.grammar_group)
         lexer.load_string(
             """
                 a=none, 
@@ -58,5 +130,310 @@ class TestLexer(unittest.TestCase):
         self.assertEqual(terminals[-1][:6], "<html>")
         self.assertEqual(terminals[-1][-7:], "</html>")
 
+    def test_columnar(self):
+        src = """
+                a = "x", // Comment
+                /* Block /* Comment "*/ b = /* " */ c
+            """
+        lexer = self.create_lexer(self.grammar_group)
+        lexer.load_string(src)
+        tokens = lexer.read_token_all()
+
+        lexer.load_string(src)
+        columns = lexer.tokenize_columnar()
+        self.assertEqual(len(columns), len(tokens))
+        self.assertEqual([(t.symbol, t.lexeme, t.position) for t in columns],
+                         [(t.symbol, t.lexeme, t.position) for t in tokens])
+        self.assertEqual("".join(columns.lexeme(i)
+                                 for i in range(len(columns))), src)
+        lexer.load_file(StringIO.StringIO(src))
+        self.assertEqual([(t.symbol, t.lexeme, t.position)
+                          for t in lexer.tokenize_columnar()],
+                         [(t.symbol, t.lexeme, t.position) for t in tokens])
+
+        lexer.load_string(src)
+        self.assertEqual([t.lexeme for t in lexer.iter_tokens()],
+                         [t.lexeme for t in tokens])
+
+        # EOF in an open group is after the group
+        lexer.load_string("a = b /* open")
+        columns = lexer.tokenize_columnar()
+        self.assertEqual(columns.offsets[-1], 13)
+        self.assertEqual(columns.position(len(columns) - 1), (1, 14))
+
+    def test_mmap(self):
+        src = "a = <html> x </html>, /* y */ b = c\n" * 2000
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "wb") as f:
+            f.write(src)
+        lexer = self.create_lexer(self.grammar_group)
+        lexer.load_string(src)
+        tokens = lexer.read_token_all()
+
+        lexer.load_file(path, use_mmap=True)
+        self.assertEqual([(t.symbol, t.lexeme, t.position)
+                          for t in lexer.read_token_all()],
+                         [(t.symbol, t.lexeme, t.position) for t in tokens])
+        self.assertRaises(ValueError, lexer.load_file, path, "utf-8", True)
+        with open(path, "rb") as f:
+            f.readline()
+            self.assertRaises(ValueError, lexer.load_file, f, None, True)
+
+    def test_many_char_classes(self):
+        # more than 128 classes are still in a byte string
+        grammar = make_literal_grammar([unichr(i) for i in xrange(32, 240)])
+        self.assertTrue(128 < grammar.charclass_count <= 256)
+        src = "".join(chr(i) for i in xrange(239, 31, -1)) * 100
+        lexer = pyauparser.Lexer(grammar)
+        lexer.load_string(src)
+        tokens = [(t.symbol, t.lexeme) for t in lexer.read_token_all()]
+        self.assertEqual(len(tokens), len(src) + 1)
+
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(src)
+            lexer.load_file(path)
+            self.assertEqual([(t.symbol, t.lexeme)
+                              for t in lexer.read_token_all()], tokens)
+        finally:
+            os.remove(path)
+        lexer.load_stream(StringIO.StringIO(src))
+        self.assertEqual([(t.symbol, t.lexeme)
+                          for t in lexer.read_token_all()], tokens)
+
+    def test_position(self):
+        src = "a = b,\n  c = /* x\n y */ d,\r\n e = f\n" * 300
+        lexer = self.create_lexer(self.grammar_group)
+        for load in (lambda: lexer.load_file(StringIO.StringIO(src)),
+                     lambda: lexer.load_string(src)):
+            load()
+            for token in lexer.read_token_all():
+                line = src.count("\n", 0, token.offset) + 1
+                column = token.offset - src.rfind("\n", 0, token.offset)
+                self.assertEqual(token.position, (line, column))
+                self.assertEqual(src[token.offset:][:len(token.lexeme)],
+                                 token.lexeme)
+            self.assertEqual(lexer.position, (src.count("\n") + 1, 1))
+
+    def test_long_group(self):
+        src = ("a = b, /*" + " comment *\n" * 3000 + "*/ (* x (* y *)" +
+               " z *" * 3000 + " *) c = <html>" + "x" * 10000 + "</html>")
+        lexer = self.create_lexer(self.grammar_group)
+        lexer.load_file(StringIO.StringIO(src))
+        tokens = lexer.read_token_all()
+        self.assertEqual([t.symbol.name for t in tokens
+                          if t.symbol.type != pyauparser.SymbolType.NOISE or
+                             len(t.lexeme) > 1],
+                         [u'ID', u'=', u'ID', u',', u'Comment', u'Comment2',
+                          u'ID', u'=', u'HTML', u'EOF'])
+        self.assertEqual("".join(t.lexeme for t in tokens), src)
+        self.assertEqual([src[t.offset:t.offset + len(t.lexeme)]
+                          for t in tokens], [t.lexeme for t in tokens])
+
+    def test_relex(self):
+        src = """a = b, c = "x y", // comment
+                 d = /* e = f, */ g, h = <html> i </html>, j = k"""
+        edits = [(0, 1, "aa"), (4, 0, "x"), (6, 0, "/*"), (6, 0, "//"),
+                 (12, 4, ""), (13, 0, '"'), (20, 5, ""), (34, 3, "\n"),
+                 (55, 2, ""), (58, 0, "*/"), (len(src), 0, " = l"),
+                 (len(src) - 1, 1, "!"), (70, 0, "</html>")]
+        lexer = self.create_lexer(self.grammar_group)
+        for offset, removed, inserted in edits:
+            lexer.load_string(src)
+            tokens = lexer.read_token_all()
+            s = src[:offset] + inserted + src[offset + removed:]
+            new_tokens = lexer.relex(s, tokens, (offset, removed, inserted))
+            lexer.load_string(s)
+            self.assertEqual([(t.symbol, t.lexeme, t.offset, t.position)
+                              for t in new_tokens],
+                             [(t.symbol, t.lexeme, t.offset, t.position)
+                              for t in lexer.read_token_all()])
+
+    def check_relex(self, grammar, src, edit):
+        lexer = self.create_lexer(grammar)
+        lexer.load_string(src)
+        tokens = lexer.read_token_all()
+        offset, removed, inserted = edit
+        s = src[:offset] + inserted + src[offset + removed:]
+        new_tokens = lexer.relex(s, tokens, edit)
+        lexer.load_string(s)
+        self.assertEqual([(t.symbol, t.lexeme, t.offset, t.position)
+                          for t in new_tokens],
+                         [(t.symbol, t.lexeme, t.offset, t.position)
+                          for t in lexer.read_token_all()])
+        return new_tokens
+
+    def test_relex_overshoot(self):
+        # a scan from "a" runs past "b" and "c" up to the edit
+        tokens = self.check_relex(self.grammar_literal, "abcX", (3, 1, "d"))
+        self.assertEqual([t.lexeme for t in tokens], ["abcd", ""])
+        tokens = self.check_relex(self.grammar_literal, "abcd", (3, 1, "X"))
+        self.assertEqual([t.lexeme for t in tokens], ["a", "b", "c", "X", ""])
+
+    def test_relex_end(self):
+        # edits after an error or EOF in an open group
+        tokens = self.check_relex(self.grammar_group, "a = ? b", (7, 0, "c"))
+        self.assertEqual([t.lexeme for t in tokens], ["a", " ", "=", " ", "?"])
+        tokens = self.check_relex(self.grammar_group, "a=b /* x",
+                                  (8, 0, "y */ c=d"))
+        self.assertEqual([t.symbol.name for t in tokens],
+                         [u"ID", u"=", u"ID", u"Whitespace", u"Comment",
+                          u"Whitespace", u"ID", u"=", u"ID", u"EOF"])
+        self.check_relex(self.grammar_group, "a=b /* x", (7, 1, "y"))
+        self.check_relex(self.grammar_group, "a=b (* x (* y *)", (0, 1, "c"))
+
+    def test_relex_random(self):
+        rand = random.Random(0)
+        pieces = ["a", "b1", " ", "\n", "=", ",", "?", '"', "\\", "/*", "*/",
+                  "//", "(*", "*)", "[*", "*]", "<html>", "</html>"]
+        for i in xrange(500):
+            src = "".join(rand.choice(pieces)
+                          for j in xrange(rand.randint(0, 20)))
+            offset = rand.randint(0, len(src))
+            removed = rand.randint(0, min(3, len(src) - offset))
+            inserted = "".join(rand.choice(pieces)
+                               for j in xrange(rand.randint(0, 2)))
+            self.check_relex(self.grammar_group, src,
+                             (offset, removed, inserted))
+
+            src = "".join(rand.choice("abcdX") for j in xrange(10))
+            offset = rand.randint(0, len(src))
+            removed = rand.randint(0, min(2, len(src) - offset))
+            inserted = "".join(rand.choice("abcdX")
+                               for j in xrange(rand.randint(0, 2)))
+            self.check_relex(self.grammar_literal, src,
+                             (offset, removed, inserted))
+
+    def test_stream(self):
+        src = ("a = b, /* x\n y */ c = <html>" + "z" * 10000 +
+               "</html>,\n") * 200
+        lexer = self.create_lexer(self.grammar_group)
+        lexer.load_string(src)
+        tokens = [(t.symbol, t.lexeme, t.offset, t.position)
+                  for t in lexer.read_token_all()]
+
+        lexer.load_stream(src[i:i + 1000] for i in xrange(0, len(src), 1000))
+        stream_tokens = []
+        buf_size = 0
+        line_count = 0
+        for t in lexer.iter_tokens():
+            stream_tokens.append((t.symbol, t.lexeme, t.offset, t.position))
+            buf_size = max(buf_size, len(lexer.buf))
+            line_count = max(line_count, len(lexer.lines.starts))
+        self.assertEqual(stream_tokens, tokens)
+        self.assertTrue(buf_size < 20000)
+        self.assertTrue(line_count < 10)
+
+    def test_stream_pipe(self):
+        # tokens are read before a pipe is filled up to a buffer size
+        for encoding in (None, "utf-8"):
+            r, w = os.pipe()
+            closed = []
+            def close():
+                closed.append(True)
+                os.close(w)
+            guard = threading.Timer(5, close)
+            guard.start()
+            os.write(w, "a = b, ")
+            lexer = self.create_lexer(self.grammar_group)
+            lexer.load_stream(r, encoding)
+            lexemes = [lexer.read_token().lexeme for i in range(6)]
+            guard.cancel()
+            self.assertEqual(closed, [])
+            self.assertEqual(lexemes, ["a", " ", "=", " ", "b", ","])
+            os.write(w, "c = d")
+            os.close(w)
+            self.assertEqual([t.lexeme for t in lexer.read_token_all()],
+                             [" ", "c", " ", "=", " ", "d", ""])
+            self.assertEqual((lexer.line, lexer.column), (1, 13))
+            os.close(r)
+
+        # a file is read after data buffered in it
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "wb") as f:
+            f.write("# header\n1+2*3\n")
+        with open(path, "rb") as f:
+            f.readline()
+            lexer = self.create_lexer(self.grammar_operator)
+            lexer.load_stream(f)
+            self.assertEqual([t.lexeme for t in lexer.read_token_all()],
+                             ["1", "+", "2", "*", "3", "\n", ""])
+
+        stream = pyauparser.TokenStream(self.grammar_group, [])
+        self.assertEqual((stream.line, stream.column), (None, None))
+
+    def test_stream_max_token_length(self):
+        lexer = self.create_lexer(self.grammar_group)
+        for src, offset in (("a = <html>" + "x" * 10000 + "</html>", 4),
+                            ("a = " + "b" * 10000, 4)):
+            lexer.load_stream(StringIO.StringIO(src), max_token_length=1000)
+            tokens = lexer.read_token_all()
+            self.assertEqual(tokens[-1].symbol.type,
+                             pyauparser.SymbolType.ERROR)
+            self.assertEqual(tokens[-1].offset, offset)
+
+    def test_parallel(self):
+        src = ("a = b, /* x\n y = z */ c = <html>\n d\n</html>,\n" +
+               "e = \"f\" // g\n") * 500
+        lexer = self.create_lexer(self.grammar_group)
+        for s in (src, src + "h = ?\n" + src, src + "h = /* i\n" + src):
+            lexer.load_string(s)
+            columns = lexer.tokenize_columnar()
+            for chunk_size in (20, 1000):
+                lexer.load_string(s)
+                parallel = lexer.tokenize_parallel(2, chunk_size)
+                self.assertEqual(parallel.symbols, columns.symbols)
+                self.assertEqual(parallel.offsets, columns.offsets)
+                self.assertEqual(parallel.lengths, columns.lengths)
+                self.assertEqual(lexer.offset,
+                                 columns.offsets[-1] + columns.lengths[-1])
+
+    def test_feed(self):
+        src = "a = b, /* x\n y */ c = <html> d </html>, e = \"f g\"\n" * 3
+        lexer = self.create_lexer(self.grammar_group)
+        lexer.load_string(src)
+        tokens = [(t.symbol, t.lexeme, t.offset, t.position)
+                  for t in lexer.read_token_all()]
+
+        lexer.load_feed()
+        fed_tokens = []
+        for i in xrange(len(src) + 1):
+            if i < len(src):
+                lexer.feed(src[i])
+            else:
+                lexer.close()
+            while not fed_tokens or fed_tokens[-1][0].type not in (
+                    pyauparser.SymbolType.END_OF_FILE,
+                    pyauparser.SymbolType.ERROR):
+                try:
+                    t = lexer.read_token()
+                except pyauparser.NeedInput:
+                    break
+                fed_tokens.append((t.symbol, t.lexeme, t.offset,
+                                   t.position))
+        self.assertEqual(fed_tokens, tokens)
+
+class TestGeneratedLexer(TestLexer):
+
+    def setUp(self):
+        TestLexer.setUp(self)
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.lexer_modules = {}
+        for name, grammar in (("operator", self.grammar_operator),
+                              ("group", self.grammar_group),
+                              ("literal", self.grammar_literal)):
+            module_name = "temp_{0}_lexer".format(name)
+            path = os.path.join(temp_dir, module_name + ".py")
+            with open(path, "wb") as f:
+                grammar.export_lexer_to_py(f)
+            self.lexer_modules[grammar] = imp.load_source(module_name, path)
+
+    def create_lexer(self, grammar):
+        return self.lexer_modules[grammar].Lexer(grammar)
+
 if __name__ == '__main__':
     unittest.main()
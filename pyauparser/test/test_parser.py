@@ -1,6 +1,26 @@
+import os
 import sys
+import shutil
+import tempfile
 import unittest
+import StringIO
 import pyauparser
+from test_lexer import make_literal_grammar
+
+def make_calculator(grammar):
+    # handler evaluating an expression of operator grammar
+    return pyauparser.ProductionHandler({
+        "<E> ::= <E> + <M>": lambda c: c[0] + c[2],
+        "<E> ::= <E> - <M>": lambda c: c[0] - c[2],
+        "<E> ::= <M>":       lambda c: c[0],
+        "<M> ::= <M> * <N>": lambda c: c[0] * c[2],
+        "<M> ::= <M> / <N>": lambda c: c[0] / c[2],
+        "<M> ::= <N>":       lambda c: c[0],
+        "<N> ::= - <V>":     lambda c: -c[1],
+        "<N> ::= <V>":       lambda c: c[0],
+        "<V> ::= Num":       lambda c: int(c[0].lexeme),
+        "<V> ::= ( <E> )":   lambda c: c[1],
+    }, grammar)
 
 class TestParser(unittest.TestCase):
 
@@ -78,5 +98,276 @@ class TestParser(unittest.TestCase):
         
         self.assertEqual(reduce_rules, check_rules)
 
+    def test_parse_all(self):
+        h = make_calculator(self.grammar)
+        for trim_reduction in (False, True):
+            parser = pyauparser.Parser(self.grammar)
+            parser.trim_reduction = trim_reduction
+            parser.load_string("-(1+2)-3*4")
+            self.assertEqual(parser.parse_all(h),
+                             pyauparser.ParseResultType.ACCEPT)
+            self.assertEqual(h.result, -15)
+
+        # an error should be same as one by parse_step
+        for s in ("1+*2", "1+2)", "1+?"):
+            parser = pyauparser.Parser(self.grammar)
+            parser.load_string(s)
+            ret = parser.parse_all(h)
+            parser2 = pyauparser.Parser(self.grammar)
+            parser2.load_string(s)
+            while True:
+                ret2 = parser2.parse_step()
+                if ret2 in (pyauparser.ParseResultType.ACCEPT,
+                            pyauparser.ParseResultType.ERROR):
+                    break
+            self.assertEqual(ret, ret2)
+            self.assertEqual(str(parser.error_info), str(parser2.error_info))
+            self.assertEqual(parser.error_info.offset,
+                             parser2.error_info.offset)
+
+    def test_trim_parse_all(self):
+        # unit chains in parse_all should give a same tree as parse_step
+        def tree(n):
+            if n.is_terminal:
+                return n.token.lexeme
+            return (n.production.index, [tree(c) for c in n.childs])
+
+        src = "-(1+2)-3*4/(5)--6"
+        builder = pyauparser.TreeBuilder()
+        parser = pyauparser.Parser(self.grammar)
+        parser.trim_reduction = True
+        parser.load_string(src)
+        self.assertEqual(parser.parse_all(builder),
+                         pyauparser.ParseResultType.ACCEPT)
+
+        builder2 = pyauparser.TreeBuilder()
+        parser2 = pyauparser.Parser(self.grammar)
+        parser2.trim_reduction = True
+        parser2.load_string(src)
+        while True:
+            ret = parser2.parse_step()
+            builder2(ret, parser2)
+            if ret in (pyauparser.ParseResultType.ACCEPT,
+                       pyauparser.ParseResultType.ERROR):
+                break
+        self.assertEqual(tree(builder.result), tree(builder2.result))
+        self.assertEqual(parser.top.production, parser2.top.production)
+        self.assertTrue(self.grammar.lalr_unit_chains)
+
+        # chains are found only in parsing with trim_reduction
+        g = pyauparser.Grammar.load_file("data/operator.egt")
+        pyauparser.parse_string(g, src)
+        self.assertEqual(len(g.lalr_unit_chains), 0)
+
+    def test_default_reduction(self):
+        # a reduction completed by ")" shouldn't wait for a next token
+        lexer = pyauparser.Lexer(self.grammar)
+        lexer.load_string("(1)*2")
+        read = []
+
+        def tokens():
+            for token in lexer.iter_tokens():
+                read.append(token)
+                yield token
+
+        reduced = []
+        rule = self.grammar.get_production("<V> ::= ( <E> )").index
+
+        def handler(ret, p):
+            if (ret == pyauparser.ParseResultType.REDUCE and
+                p.reduction.production.index == rule):
+                reduced.append(read[-1].lexeme)
+
+        parser = pyauparser.Parser(self.grammar)
+        parser.load_tokens(tokens())
+        self.assertEqual(parser.parse_all(handler),
+                         pyauparser.ParseResultType.ACCEPT)
+        self.assertEqual(reduced, [")"])
+
+    def test_parse_many(self):
+        srcs = ["1+2", "3*(4-5)", "6+*7", "\n\n8?", "-9"] * 5
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        paths = []
+        for i, src in enumerate(srcs):
+            path = os.path.join(temp_dir, "many_{0:02}.txt".format(i))
+            with open(path, "wb") as f:
+                f.write(src)
+            paths.append(path)
+
+        def handler_factory():
+            return make_calculator(self.grammar)
+
+        expected = []
+        for path in paths:
+            h = handler_factory()
+            try:
+                pyauparser.parse_file(self.grammar, path, handler=h)
+                expected.append((path, h.result))
+            except pyauparser.ParseError as e:
+                expected.append((path, str(e)))
+        for workers in (1, 2):
+            results = [(path, str(r) if isinstance(r, Exception) else r)
+                       for path, r in pyauparser.parse_many(
+                           self.grammar, paths, handler_factory, workers)]
+            self.assertEqual(results, expected)
+        self.assertEqual(sorted(pyauparser.parse_many(
+            self.grammar, paths, workers=2, ordered=False))[:2],
+            [(paths[0], None), (paths[1], None)])
+        self.assertEqual(pyauparser.utility._many_source, None)
+
+    def test_feed(self):
+        h = make_calculator(self.grammar)
+        parser = pyauparser.Parser(self.grammar)
+        parser.load_feed(h)
+        for c in ["-(1", "+", "2)-", "3*4", "0"]:
+            self.assertEqual(parser.feed(c),
+                             pyauparser.ParseResultType.NEED_INPUT)
+        self.assertEqual(parser.close(), pyauparser.ParseResultType.ACCEPT)
+        self.assertEqual(h.result, -123)
+
+        parser.load_feed()
+        self.assertEqual(parser.feed("1+"),
+                         pyauparser.ParseResultType.NEED_INPUT)
+        self.assertEqual(parser.feed("*2"), pyauparser.ParseResultType.ERROR)
+        self.assertEqual(parser.error_info.token.lexeme, "*")
+
+    def test_checkpoint(self):
+        h = make_calculator(self.grammar)
+        parser = pyauparser.Parser(self.grammar)
+        parser.load_feed(h)
+        parser.feed("(1+2)*1")
+        checkpoint = parser.checkpoint()
+        for suffix, ret, result in (("0", pyauparser.ParseResultType.ACCEPT, 30),
+                                    ("-4", pyauparser.ParseResultType.ACCEPT, -1),
+                                    ("+)", pyauparser.ParseResultType.ERROR, None),
+                                    ("", pyauparser.ParseResultType.ACCEPT, 3)):
+            h.result = None
+            parser.restore(checkpoint)
+            parser.feed(suffix)
+            self.assertEqual(parser.close(), ret)
+            self.assertEqual(h.result, result)
+
+        parser.load_string("1+2*3")
+        for i in range(4):
+            h(parser.parse_step(), parser)
+        checkpoint = parser.checkpoint()
+        for i in range(2):
+            h.result = None
+            parser.restore(checkpoint)
+            self.assertEqual(parser.parse_all(h),
+                             pyauparser.ParseResultType.ACCEPT)
+            self.assertEqual(h.result, 7)
+
+        # a file is rewound and a stream can't be restored
+        parser.load_file(StringIO.StringIO("+".join(["1"] * 5000)))
+        for i in range(10):
+            h(parser.parse_step(), parser)
+        checkpoint = parser.checkpoint()
+        for i in range(2):
+            h.result = None
+            parser.restore(checkpoint)
+            self.assertEqual(parser.parse_all(h),
+                             pyauparser.ParseResultType.ACCEPT)
+            self.assertEqual(h.result, 5000)
+        parser.load_stream(["1+2"])
+        self.assertRaises(ValueError, parser.checkpoint)
+
+    def test_error_recovery(self):
+        for sync_symbols, offsets in (
+                ((), [2]),
+                (("+",), [2, 8]),
+                ((self.grammar.get_symbol("+"),), [2, 8])):
+            parser = pyauparser.Parser(self.grammar)
+            parser.error_recovery = True
+            parser.sync_symbols = sync_symbols
+            parser.load_string("1+*2+(3*)-4?5")
+            builder = pyauparser.TreeBuilder()
+            self.assertEqual(parser.parse_all(builder),
+                             pyauparser.ParseResultType.ERROR)
+            self.assertEqual([e.offset - len(e.token.lexeme)
+                              for e in parser.errors[:-1]], offsets)
+            self.assertEqual(parser.errors[-1].type,
+                             pyauparser.ParseErrorType.LEXICAL_ERROR)
+            self.assertTrue(builder.result is not None)
+
+        parser = pyauparser.Parser(self.grammar)
+        parser.error_recovery = True
+        parser.load_string("1+2")
+        self.assertEqual(parser.parse_all(),
+                         pyauparser.ParseResultType.ACCEPT)
+        self.assertEqual(parser.errors, [])
+
+    def test_incremental(self):
+        def dump(n):
+            if n.is_terminal:
+                return (n.token.symbol.index, n.token.lexeme, n.token.offset,
+                        n.token.position)
+            return (n.production.index, [dump(c) for c in n.childs])
+
+        g = pyauparser.Grammar.load_file("data/group.egt")
+        src = ", ".join(["a = b, c = \"d\",\n e = <html> f </html>"] * 20)
+        edits = [lambda s: (0, 1, "aa"),
+                 lambda s: (s.find("b"), 1, "bb"),
+                 lambda s: (len(s), 0, ", i = j"),
+                 lambda s: (len(s) - 1, 1, "k"),
+                 lambda s: (s.find("e ="), 0, "/* k */"),
+                 lambda s: (s.find(", c"), 0, ", m = n"),
+                 lambda s: (s.find("<html>", 200), 6, "<html> o"),
+                 lambda s: (s.find("a = b", 300), 7, "")]
+        p = pyauparser.IncrementalParser(g)
+        p.parse(src)
+        for edit in edits:
+            offset, removed, inserted = edit(src)
+            src = src[:offset] + inserted + src[offset + removed:]
+            tree = p.reparse(src, (offset, removed, inserted))
+            self.assertEqual(dump(tree), dump(
+                pyauparser.parse_string_to_tree(g, src)))
+            self.assertTrue(p.reused_count > 0)
+
+        # an error drops the tree and a next edit is parsed again
+        s = src[:3] + "," + src[3:]
+        self.assertRaises(pyauparser.ParseError, p.reparse, s, (3, 0, ","))
+        tree = p.reparse(src, (3, 1, ""))
+        self.assertEqual(dump(tree), dump(
+            pyauparser.parse_string_to_tree(g, src)))
+
+        # a scan from "a" runs past "b" and "c" up to the edit
+        g = make_literal_grammar(["a", "b", "c", "d", "X", "abcd"])
+        p = pyauparser.IncrementalParser(g)
+        p.parse("abcX")
+        for s, edit in (("abcd", (3, 1, "d")), ("abcdabcX", (4, 0, "abcX"))):
+            tree = p.reparse(s, edit)
+            self.assertEqual(dump(tree), dump(
+                pyauparser.parse_string_to_tree(g, s)))
+        self.assertEqual([t.lexeme for t in p.terminals],
+                         ["abcd", "a", "b", "c", "X", ""])
+
+    def test_load_tokens(self):
+        lexer = pyauparser.Lexer(self.grammar)
+        lexer.load_stream(iter(["-(1", "+2)-", "3*4"]))
+        parser = pyauparser.Parser(self.grammar)
+        parser.load_tokens(lexer.iter_tokens())
+
+        reduce_count = 0
+        while True:
+            ret = parser.parse_reduce()
+            if ret == pyauparser.ParseResultType.REDUCE:
+                reduce_count += 1
+            elif ret == pyauparser.ParseResultType.ACCEPT:
+                break
+            else:
+                self.fail(parser.error_info)
+                return
+        self.assertEqual(reduce_count, 19)
+
+        # an error at EOF of no tokens has no position
+        parser.load_tokens([])
+        self.assertEqual(parser.parse_all(),
+                         pyauparser.ParseResultType.ERROR)
+        self.assertTrue(str(parser.error_info).startswith("SyntaxError(?:?)"))
+        self.assertEqual(str(pyauparser.ParseError(parser.error_info)),
+                         str(parser.error_info))
+
 if __name__ == '__main__':
     unittest.main()
@@ -39,19 +39,19 @@ class TreeBuilder(object):
     """TreeBuilder build a concrete syntax tree (parse-tree)
     """
 
+    handle_shift = False
+
     def __init__(self):
         self.result = None
 
     def __call__(self, ret, p):
-        if ret == parser.ParseResultType.SHIFT:
-            # create a terminal node
-            p.top.data = TreeNode(token=p.top.token)
-
-        elif ret == parser.ParseResultType.REDUCE:
-            # create a non-terminal node
+        if ret == parser.ParseResultType.REDUCE:
+            # create a non-terminal node with terminal nodes of handles
             r = p.reduction
             r.head.data = TreeNode(production=r.production,
-                                   childs=[h.data for h in r.handles])
+                                   childs=[h.data if h.production else
+                                           TreeNode(token=h.token)
+                                           for h in r.handles])
 
         elif ret == parser.ParseResultType.ACCEPT:
             self.result = p.top.data
@@ -63,6 +63,8 @@ class SimplifiedTreeBuilder(object):
        Productions in grammar have sr_* properties controlling a tree shape.
     """
 
+    handle_shift = False
+
     def __init__(self):
         self.result = None
 
@@ -2,6 +2,7 @@ import os
 import sys
 import parser
 import tree
+from lexer import Token
 
 
 class ParseError(Exception):
@@ -64,3 +65,102 @@ def parse_string_to_stree(grammar, s, encoding=None):
         return builder.result
     else:
         raise ParseError(p.error_info)
+
+
+_many_source = None
+
+
+def _init_many(grammar, handler_factory, encoding):
+    # keep arguments of parse_many in a worker process
+    global _many_source
+    _many_source = (grammar, handler_factory, encoding)
+
+
+def _pack_error(info):
+    # make error_info into a small tuple of indices and lines near it
+    token = info.token
+    if token is None or token.symbol is None:
+        token = None
+        start = info.offset
+    else:
+        start = min(token.offset, info.offset)
+        token = (token.symbol.index, token.lexeme, token.offset)
+    if info.expected_symbols is None:
+        expected = None
+    else:
+        expected = [s.index for s in info.expected_symbols]
+    lines = info.lines.part(start, info.offset) if info.lines else None
+    return (info.type, info.offset, info.state.index, token, expected,
+            lines)
+
+
+def _unpack_error(grammar, packed):
+    type, offset, state, token, expected, lines = packed
+    if token is not None:
+        token = Token(grammar.symbols[token[0]], token[1], token[2], lines)
+    if expected is not None:
+        expected = [grammar.symbols[i] for i in expected]
+    return ParseError(parser.ParseErrorInfo(
+        type, offset, grammar.lalrstates[state], token, expected, lines))
+
+
+def _parse_input(grammar, handler_factory, encoding, file_or_path):
+    # return a tuple of (accepted, result of handler or parser)
+    handler = handler_factory() if handler_factory else None
+    p = parser.Parser(grammar)
+    p.load_file(file_or_path, encoding)
+    if p.parse_all(handler) == parser.ParseResultType.ACCEPT:
+        return True, handler.result if handler else None
+    else:
+        return False, p
+
+
+def _parse_one(file_or_path):
+    grammar, handler_factory, encoding = _many_source
+    ok, value = _parse_input(grammar, handler_factory, encoding,
+                             file_or_path)
+    if ok:
+        return file_or_path, True, value
+    else:
+        return file_or_path, False, _pack_error(value.error_info)
+
+
+def parse_many(grammar, inputs, handler_factory=None, workers=None,
+               encoding=None, ordered=True):
+    """Parse files in processes and generate a tuple of (input, result)
+       for each, where result is a result of a handler made by
+       handler_factory or ParseError. They come in an order of inputs,
+       or in an order of completion if ordered is False.
+       Grammar and handler_factory are inherited by forked workers and
+       only file paths and results are passed between processes.
+       With one worker, inputs are parsed in this process.
+    """
+    import multiprocessing
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1:
+        for file_or_path in inputs:
+            ok, value = _parse_input(grammar, handler_factory, encoding,
+                                     file_or_path)
+            if ok:
+                yield file_or_path, value
+            else:
+                yield file_or_path, ParseError(value.error_info)
+        return
+
+    pool = multiprocessing.Pool(workers, _init_many,
+                                (grammar, handler_factory, encoding))
+    if ordered:
+        results = pool.imap(_parse_one, inputs, 16)
+    else:
+        results = pool.imap_unordered(_parse_one, inputs, 16)
+    try:
+        for file_or_path, ok, value in results:
+            if ok:
+                yield file_or_path, value
+            else:
+                yield file_or_path, _unpack_error(grammar, value)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
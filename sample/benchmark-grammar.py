@@ -0,0 +1,26 @@
+#!/usr/bin/python2
+
+import os
+import sys
+import time
+import pyauparser
+
+
+def benchmark(egt_path, repeat):
+    with open(egt_path, "rb") as f:
+        size = len(f.read())
+    t = time.time()
+    for i in range(repeat):
+        pyauparser.Grammar.load_file(egt_path)
+    t = (time.time() - t) / repeat
+    print "{0}\t{1} bytes\t{2:.2f}ms".format(
+        os.path.basename(egt_path), size, t * 1000)
+
+
+def main():
+    for name in ("json", "list", "operator", "tiny"):
+        benchmark("data/{0}.egt".format(name), 200)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/python2
+
+import os
+import sys
+import time
+import pyauparser
+
+
+def actions_size(g):
+    # bytes of dicts of LALRAction objects kept in states
+    size = 0
+    for s in g.lalrstates.itervalues():
+        if "actions" not in s.__dict__:
+            continue
+        size += sys.getsizeof(s.actions)
+        for a in s.actions.itervalues():
+            size += sys.getsizeof(a) + sys.getsizeof(a.__dict__)
+    return size
+
+
+def table_size(table):
+    if hasattr(table, "check"):
+        arrays = (table.base, table.check, table.value)
+    else:
+        arrays = (table,)
+    return sum(len(a) * a.itemsize for a in arrays)
+
+
+def benchmark(egt_path, data_paths, repeat, sep, head="", tail=""):
+    src = head + sep.join(open(path, "rb").read().strip()
+                          for path in data_paths * repeat) + tail
+    for name, compress in (("dense", False), ("compressed", True)):
+        g = pyauparser.Grammar.load_file(egt_path, compress_lalr=compress)
+        p = pyauparser.Parser(g)
+        p.load_string(src)
+        t = time.time()
+        ret = p.parse_all()
+        t = time.time() - t
+        assert ret == pyauparser.ParseResultType.ACCEPT
+        print "{0}\t{1:<10}\tactions {2} bytes\ttable {3} bytes\t{4:.3f}s".format(
+            os.path.basename(egt_path), name, actions_size(g),
+            table_size(g.lalr_table), t)
+
+
+def main():
+    benchmark("data/json.egt",
+              ["data/json_sample_1.txt", "data/json_sample_2.txt"], 2000,
+              ",\n", "[", "]")
+    benchmark("data/tiny.egt",
+              ["data/tiny_sample_1.txt", "data/tiny_sample_2.txt"], 2000,
+              ";\n")
+
+
+if __name__ == "__main__":
+    main()
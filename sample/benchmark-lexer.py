@@ -0,0 +1,50 @@
+#!/usr/bin/python2
+
+import os
+import sys
+import time
+import imp
+import tempfile
+import pyauparser
+
+
+def read_all(lexer):
+    n = 0
+    while True:
+        token = lexer.read_token()
+        n += 1
+        if token.symbol.type in (pyauparser.SymbolType.END_OF_FILE,
+                                 pyauparser.SymbolType.ERROR):
+            return n
+
+
+def benchmark(egt_path, data_paths, repeat):
+    g = pyauparser.Grammar.load_file(egt_path)
+    src = "".join(open(path, "rb").read() for path in data_paths) * repeat
+
+    # export a specialized lexer and load it as a module
+    fd, py_path = tempfile.mkstemp(suffix=".py")
+    with os.fdopen(fd, "wb") as f:
+        g.export_lexer_to_py(f)
+    module = imp.load_source("benchmark_lexer", py_path)
+    os.remove(py_path)
+
+    for name, lexer in (("Lexer", pyauparser.Lexer(g)),
+                        ("generated", module.Lexer(g))):
+        lexer.load_string(src)
+        t = time.time()
+        n = read_all(lexer)
+        t = time.time() - t
+        print "{0}\t{1:<10}\t{2} tokens\t{3:.3f}s".format(
+            os.path.basename(egt_path), name, n, t)
+
+
+def main():
+    benchmark("data/json.egt",
+              ["data/json_sample_1.txt", "data/json_sample_2.txt"], 200)
+    benchmark("data/tiny.egt",
+              ["data/tiny_sample_1.txt", "data/tiny_sample_2.txt"], 200)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ import pyauparser
 
 
 def c_show(cmd_args):
-    opts, args = getopt.getopt(cmd_args, "spP")
+    opts, args = getopt.getopt(cmd_args, "spPm")
 
     mode = ""
     for o, a in opts:
@@ -19,6 +19,8 @@ def c_show(cmd_args):
             mode = o
         elif o == "-P":
             mode = o
+        elif o == "-m":
+            mode = o
 
     egt_path = args[0]
     g = pyauparser.Grammar.load_file(egt_path)
@@ -42,6 +44,11 @@ def c_show(cmd_args):
         for k, v in sorted(g.productions.iteritems()):
             print('\t{0}: None,'.format(repr(v.id)))
         print "}"
+    elif mode == "-m":
+        stats = g.minimize_dfa()
+        print "* dfa minimization"
+        for name in ("states", "edges"):
+            print('\t{0}\t{1} -> {2}'.format(name, *stats[name]))
 
 
 def c_class(cmd_args):
@@ -67,6 +74,29 @@ def c_class(cmd_args):
         print(f.getvalue())
 
 
+def c_genlexer(cmd_args):
+    opts, args = getopt.getopt(cmd_args, "e:")
+
+    encoding = "utf-8"
+    for o, a in opts:
+        if o == "-e":
+            encoding = a
+
+    egt_path = args[0]
+    g = pyauparser.Grammar.load_file(egt_path)
+
+    py_path = args[1] if len(args) > 1 else None
+    if py_path:
+        f = codecs.open(py_path, "w", encoding)
+        g.export_lexer_to_py(f)
+        f.close()
+        print("{0}: done".format(py_path))
+    else:
+        f = StringIO.StringIO()
+        g.export_lexer_to_py(f)
+        print(f.getvalue())
+
+
 def c_lex(cmd_args):
     opts, args = getopt.getopt(cmd_args, "e:")
 
@@ -166,11 +196,16 @@ def usage():
     print "    -s show a symbol list"
     print "    -p show a production rule list"
     print "    -P show a production rule list as py dictionary"
+    print "    -m show counts of dfa states and edges reduced by minimization"
     print
     print "  c[lass]    : create a module embedding a grammar file"
     print "    [options] egt [output]"
     print "    -e set output encoding"
     print
+    print "  g[enlexer] : create a module embedding a lexer specialized for a grammar"
+    print "    [options] egt [output]"
+    print "    -e set output encoding"
+    print
     print "  l[ex]      : show lexing procedure"
     print "    [options] egt data"
     print "    -e set input encoding"
@@ -200,6 +235,8 @@ def main():
         c_show(cmd_args)
     elif cmd in ("c", "class"):
         c_class(cmd_args)
+    elif cmd in ("g", "genlexer"):
+        c_genlexer(cmd_args)
     elif cmd in ("l", "lex"):
         c_lex(cmd_args)
     elif cmd in ("p", "parse"):
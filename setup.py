@@ -1,8 +1,15 @@
+import os
 from distutils.core import setup
 
+# version is kept in one place which grammar caches are keyed by
+version = {}
+with open(os.path.join(os.path.dirname(__file__), "pyauparser",
+                       "version.py")) as f:
+    exec(f.read(), version)
+
 setup(
     name='PyAuParser',
-    version='0.53.1',
+    version=version['__version__'],
     author="Esun Kim",
     author_email='veblush+git_at_gmail.com',
     url='https://github.com/veblush/PyAuParser',